@@ -0,0 +1,211 @@
+"""
+Admission Control - Global and per-client concurrency limits for draft generation.
+Every draft fans out into several LLM calls, so unbounded concurrency turns a load spike
+into cascading timeouts. Requests beyond the limits wait in a bounded queue; when the
+expected wait exceeds the latency target they are rejected fast with a Retry-After hint.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque, defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Deque, Optional, Tuple
+
+from metrics import ADMISSION_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted (maps to 429/503 with Retry-After)"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue.
+
+    - At most ADMISSION_MAX_CONCURRENT drafts run at once, and at most
+      ADMISSION_MAX_PER_CLIENT per identified client (anonymous requests only
+      count against the global limit)
+    - A client already using its share with as many requests waiting gets 429
+    - A full queue, or an expected wait above ADMISSION_QUEUE_TARGET seconds, gets 503
+    - Expected wait is estimated from a moving average of draft durations
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+        self.max_concurrent = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+        self.max_per_client = int(os.getenv("ADMISSION_MAX_PER_CLIENT", "4"))
+        self.queue_size = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+        self.queue_target = float(os.getenv("ADMISSION_QUEUE_TARGET", "10.0"))
+
+        self.active = 0
+        self.active_per_client: Dict[str, int] = defaultdict(int)
+        self.waiting_per_client: Dict[str, int] = defaultdict(int)
+        self._waiters: Deque[Tuple[Optional[str], asyncio.Future]] = deque()
+
+        # Moving average of how long an admitted draft holds its slot
+        self.avg_service_time = 0.0
+        self.avg_queue_wait = 0.0
+        self._alpha = 0.2
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_client_limit = 0
+        self.rejected_overload = 0
+        self.max_queue_depth = 0
+
+        logger.info("Admission Controller initialized", extra={
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "max_per_client": self.max_per_client,
+            "queue_size": self.queue_size,
+            "queue_target": self.queue_target
+        })
+
+    def _can_run(self, client_id: Optional[str]) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        return client_id is None or self.active_per_client.get(client_id, 0) < self.max_per_client
+
+    def _expected_wait(self) -> float:
+        """Estimated wait for a request joining the back of the queue"""
+        return (len(self._waiters) + 1) * self.avg_service_time / self.max_concurrent
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._expected_wait()))
+
+    def _acquire(self, client_id: Optional[str]):
+        self.active += 1
+        if client_id is not None:
+            self.active_per_client[client_id] += 1
+        self.admitted += 1
+
+    def _release(self, client_id: Optional[str]):
+        self.active -= 1
+        if client_id is not None:
+            self.active_per_client[client_id] -= 1
+            if not self.active_per_client[client_id]:
+                del self.active_per_client[client_id]
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Hand free slots to the oldest waiters whose client is under its limit"""
+        for entry in list(self._waiters):
+            if self.active >= self.max_concurrent:
+                break
+            client_id, future = entry
+            if future.done() or not self._can_run(client_id):
+                continue
+            self._waiters.remove(entry)
+            self._acquire(client_id)
+            future.set_result(True)
+
+    def _reject(self, status_code: int, reason: str, client_id: Optional[str]) -> AdmissionRejected:
+        if status_code == 429:
+            self.rejected_client_limit += 1
+        else:
+            self.rejected_overload += 1
+        retry_after = self._retry_after()
+        logger.warning("Draft request rejected by admission control", extra={
+            "client_id": client_id,
+            "reason": reason,
+            "queue_depth": len(self._waiters),
+            "active": self.active,
+            "retry_after": retry_after
+        })
+        return AdmissionRejected(status_code, retry_after, reason)
+
+    @asynccontextmanager
+    async def admit(self, client_id: Optional[str] = None):
+        """
+        Hold a concurrency slot for the duration of the block.
+
+        Args:
+            client_id: Client identity for the per-client limit (None = global limit only)
+
+        Raises:
+            AdmissionRejected: If the request should be retried later
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if self._can_run(client_id) and not self._waiters:
+            self._acquire(client_id)
+        else:
+            if client_id is not None and \
+                    self.active_per_client.get(client_id, 0) >= self.max_per_client and \
+                    self.waiting_per_client.get(client_id, 0) >= self.max_per_client:
+                raise self._reject(429, "Too many concurrent requests for this client", client_id)
+            if len(self._waiters) >= self.queue_size:
+                raise self._reject(503, "Draft generation queue is full", client_id)
+            if self._expected_wait() > self.queue_target:
+                raise self._reject(503, "Expected queue wait exceeds latency target", client_id)
+
+            future = asyncio.get_running_loop().create_future()
+            entry = (client_id, future)
+            self._waiters.append(entry)
+            self.waiting_per_client[client_id] += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            # Waiters ahead may be blocked only by their own client limit
+            self._wake_waiters()
+            queued_at = time.monotonic()
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_target)
+            except asyncio.TimeoutError:
+                if future.done():
+                    # Admitted just as the timeout fired - give the slot back
+                    self._release(client_id)
+                raise self._reject(503, "Queue wait exceeded latency target", client_id)
+            except asyncio.CancelledError:
+                if future.done():
+                    self._release(client_id)
+                raise
+            finally:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self.waiting_per_client[client_id] -= 1
+                if not self.waiting_per_client[client_id]:
+                    del self.waiting_per_client[client_id]
+            wait = time.monotonic() - queued_at
+            self.avg_queue_wait += self._alpha * (wait - self.avg_queue_wait)
+            ADMISSION_QUEUE_WAIT.observe(wait)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self.avg_service_time += self._alpha * (elapsed - self.avg_service_time)
+            self._release(client_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Admission metrics (queue depth, active slots, rejections)"""
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_client_limit": self.rejected_client_limit,
+            "rejected_overload": self.rejected_overload,
+            "avg_queue_wait": round(self.avg_queue_wait, 3),
+            "avg_service_time": round(self.avg_service_time, 3)
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController()
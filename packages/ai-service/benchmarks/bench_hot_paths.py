@@ -0,0 +1,291 @@
+"""
+Hot Path Benchmark - Per-call cost of the CPU-bound draft pipeline stages.
+
+Covers RuleEngine.enforce_rules / apply_transformations, SchemaManager.get_section_rules,
+the prompt template path used by the pipeline (compiling a schema's prompts, the cached
+per-request lookup and CompiledSectionPrompt.render_user_prompt) and
+PromptEngineer.parse_llm_response across content sizes (1KB-50KB) and rule counts (4-500). Inputs are generated
+deterministically, so runs on the same machine are comparable.
+
+Results are written as JSON (median/min microseconds per call for every case). Passing
+--baseline compares against an earlier results file and exits non-zero if any case's
+median got slower than --max-regression (e.g. 0.25 = 25%).
+
+Usage:
+    python benchmarks/bench_hot_paths.py --output results.json
+    python benchmarks/bench_hot_paths.py --baseline baseline.json --max-regression 0.25
+    python benchmarks/bench_hot_paths.py --quick --filter enforce_rules
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Any, Callable, Dict, List, Tuple
+
+# Keep per-call INFO logs out of the measurements and the terminal
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import rule_engine
+from schema_manager import SchemaManager, SectionRule, SectionSchema, ProposalSchema
+from prompt_engineering import prompt_engineer
+from prompt_templates import CompiledSchemaPrompts, PromptTemplateCache, STRUCTURED_OUTPUT
+
+CONTENT_SIZES = (1_000, 10_000, 50_000)
+RULE_COUNTS = (4, 50, 500)
+QUICK_CONTENT_SIZES = (1_000, 10_000)
+QUICK_RULE_COUNTS = (4, 50)
+
+CONTENT_LINE = "- Install 24 PoE+ access points across both warehouse buildings for $18,500 USD (phase 1, week 2)\n"
+
+
+def make_content(size: int) -> str:
+    """List-formatted section content of about size characters"""
+    return (CONTENT_LINE * (size // len(CONTENT_LINE) + 1))[:size]
+
+
+def make_rules(count: int) -> List[SectionRule]:
+    """A deterministic mix of every rule type, shaped like admin-defined schema rules"""
+    templates: List[Tuple[str, Dict[str, Any]]] = [
+        ("length", {"min": 100, "max": 60_000}),
+        ("pattern", {"pattern": r"\$\d[\d,]*"}),
+        ("required_field", {"fields": ["access points", "warehouse", "cutover"]}),
+        ("validation", {"check_for": ["lorem ipsum", "TBD", "[placeholder]"], "min_items": 3}),
+        ("format", {"format": "list"}),
+        ("format", {"format": "itemized"}),
+        ("transformation", {"type": "replace", "find": "PoE+", "replace": "PoE+ (802.3at)"}),
+        ("constraint", {}),
+    ]
+    rules = []
+    for i in range(count):
+        rule_type, parameters = templates[i % len(templates)]
+        rules.append(SectionRule(
+            id=f"rule_{i}",
+            name=f"Benchmark rule {i}",
+            type=rule_type,
+            description=f"Benchmark {rule_type} rule number {i} applied to the section",
+            enforcement="strict" if i % 2 else "warning",
+            parameters=parameters
+        ))
+    return rules
+
+
+def make_section(rules: List[SectionRule]) -> SectionSchema:
+    return SectionSchema(
+        id="scope_of_work",
+        name="scope_of_work",
+        display_name="Scope of Work",
+        description="Detailed breakdown of work to be performed",
+        order=1,
+        rules=rules,
+        output_format="list",
+        min_length=200,
+        max_length=3000
+    )
+
+
+def make_schema(rules: List[SectionRule]) -> ProposalSchema:
+    """Schema with several sections; the benchmarked section is the last one"""
+    sections = [
+        make_section([]).model_copy(update={"id": f"filler_{i}", "name": f"filler_{i}", "order": i})
+        for i in range(5)
+    ]
+    sections.append(make_section(rules).model_copy(update={"order": len(sections)}))
+    return ProposalSchema(
+        id="bench-schema",
+        name="Benchmark Schema",
+        version="1.0.0",
+        description="Benchmark schema",
+        created_by="benchmark",
+        created_at="2024-01-01T00:00:00Z",
+        sections=sections,
+        global_rules=rules[:4]
+    )
+
+
+def make_schema_manager(rules: List[SectionRule]) -> SchemaManager:
+    manager = SchemaManager()
+    manager.load_schema(make_schema(rules).model_dump())
+    return manager
+
+
+def make_llm_response(content: str, fenced: bool = False) -> str:
+    """Structured-output response; fenced responses take the tolerant extraction path"""
+    response = json.dumps({
+        "content": content,
+        "confidence": 0.82,
+        "rationale": "Derived from the survey notes",
+        "sources": ["survey notes"],
+        "missing_info": []
+    })
+    if fenced:
+        return f"Here is the section:\n```json\n{response}\n```"
+    return response
+
+
+def build_cases(content_sizes, rule_counts) -> List[Tuple[str, Dict[str, int], Callable[[], Any]]]:
+    """(benchmark name, parameters, zero-argument callable) for every combination"""
+    cases = []
+    for rule_count in rule_counts:
+        rules = make_rules(rule_count)
+        schema = make_schema(rules)
+        manager = make_schema_manager(rules)
+        template_cache = PromptTemplateCache()
+        template_cache.get(schema)
+        params = {"rules": rule_count}
+        cases.append((
+            "get_section_rules", params,
+            lambda manager=manager: manager.get_section_rules("bench-schema", "scope_of_work")
+        ))
+        # Paid once per schema version
+        cases.append((
+            "compile_schema_prompts", params,
+            lambda schema=schema: CompiledSchemaPrompts(schema, STRUCTURED_OUTPUT)
+        ))
+        # Paid per section of every draft
+        cases.append((
+            "get_section_prompt", params,
+            lambda schema=schema, template_cache=template_cache: template_cache.get_section(
+                schema, "scope_of_work"
+            ).system_message
+        ))
+
+        for size in content_sizes:
+            content = make_content(size)
+            params = {"content_bytes": size, "rules": rule_count}
+            cases.append((
+                "enforce_rules", params,
+                lambda content=content, rules=rules: rule_engine.enforce_rules(
+                    content, rules, "scope_of_work", content
+                )
+            ))
+            cases.append((
+                "apply_transformations", params,
+                lambda content=content, rules=rules: rule_engine.apply_transformations(content, rules)
+            ))
+
+    section_prompt = CompiledSchemaPrompts(make_schema(make_rules(4)), STRUCTURED_OUTPUT).sections["scope_of_work"]
+    for size in content_sizes:
+        content = make_content(size)
+        params = {"content_bytes": size}
+        cases.append((
+            "render_user_prompt", params,
+            lambda content=content: section_prompt.render_user_prompt(content, "Emphasize the cutover plan")
+        ))
+        for fenced in (False, True):
+            response = make_llm_response(content, fenced)
+            cases.append((
+                "parse_llm_response_fenced" if fenced else "parse_llm_response", params,
+                lambda response=response: prompt_engineer.parse_llm_response(response)
+            ))
+    return cases
+
+
+def case_key(name: str, params: Dict[str, int]) -> str:
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """Median and min seconds per call over repeat rounds of at least min_time each"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": statistics.median(per_call) * 1e6,
+        "min_us": min(per_call) * 1e6,
+        "calls_per_round": number,
+        "rounds": repeat
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print a comparison table and return the keys that regressed beyond max_regression"""
+    regressions = []
+    print(f"\n{'case':<60}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for key, current in results["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            print(f"{key:<60}{'-':>14}{current['median_us']:>14.1f}{'new':>10}")
+            continue
+        change = current["median_us"] / previous["median_us"] - 1
+        flag = ""
+        if change > max_regression:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<60}{previous['median_us']:>14.1f}{current['median_us']:>14.1f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare against this results file")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed median slowdown per case before failing (fraction)")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per round")
+    parser.add_argument("--quick", action="store_true", help="Smaller size/rule grid")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    if args.quick:
+        cases = build_cases(QUICK_CONTENT_SIZES, QUICK_RULE_COUNTS)
+    else:
+        cases = build_cases(CONTENT_SIZES, RULE_COUNTS)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case[0]]
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "min_time": args.min_time
+        },
+        "results": {}
+    }
+
+    print(f"{'case':<60}{'median us':>14}{'min us':>14}")
+    for name, params, func in cases:
+        key = case_key(name, params)
+        stats = measure(func, args.repeat, args.min_time)
+        results["results"][key] = {"benchmark": name, "params": params, **stats}
+        print(f"{key:<60}{stats['median_us']:>14.1f}{stats['min_us']:>14.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.max_regression:.0%}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Load Test - Drives /api/ai/generate-draft against a local stub LLM provider.
+
+Starts benchmarks/stub_llm_server.py and the service (uvicorn, LLM_PROVIDER=openai with
+OPENAI_API_BASE pointing at the stub) as subprocesses, sends draft requests at a fixed
+concurrency (closed loop: each worker sends its next request when the previous one
+returns) and reports throughput and p50/p95/p99 latency. The LLM is simulated, so the
+numbers measure the service itself - queueing, admission, scheduling and per-section
+overhead - not provider speed, and runs cost nothing.
+
+Service overhead is estimated as mean request latency minus the stub latency of the
+calls each request made (sections run sequentially, so this holds when nothing queues).
+
+Usage:
+    python benchmarks/load_test.py --concurrency 8 --requests 200
+    python benchmarks/load_test.py --concurrency 32 --duration 60 --latency uniform:200:1500 --error-rate 0.05
+    python benchmarks/load_test.py --service-env ADMISSION_MAX_CONCURRENT=4 --json results.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCHMARK_DIR)
+
+SURVEY_NOTES = """
+Client: Northwind Logistics. Site survey for warehouse network upgrade.
+- Two buildings, 40,000 sq ft total, 120 wireless clients during peak shifts
+- Existing Cisco switches are end of life; need PoE+ for 24 new access points
+- Dock doors have dead zones; handheld scanners drop connections
+- Cutover must happen over two weekends, no downtime during weekday shifts
+- Budget approved for Q3, decision makers: IT director and operations VP
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    """Poll url until it answers, failing early if the process exits"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process exited with code {process.returncode} before {url} was ready")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def start_stub(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, os.path.join(BENCHMARK_DIR, "stub_llm_server.py"),
+        "--port", str(port),
+        "--latency", args.latency,
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--completion-tokens", str(args.completion_tokens)
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    return subprocess.Popen(command)
+
+
+def start_service(args: argparse.Namespace, port: int, stub_port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "openai",
+        "OPENAI_API_KEY": "stub-key",
+        "OPENAI_API_BASE": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENAI_MODEL": "stub-model",
+        "BACKEND_URL": "http://127.0.0.1:9",  # No backend: schema sync fails fast, default schema is used
+        "LOG_LEVEL": args.service_log_level
+    })
+    for assignment in args.service_env:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log"
+    ]
+    return subprocess.Popen(command, cwd=SERVICE_DIR, env=env)
+
+
+async def run_load(args: argparse.Namespace, base_url: str) -> Dict:
+    """Closed-loop load: args.concurrency workers until the request count or duration is reached"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    partial = 0
+    sent = 0
+    stop_at = time.monotonic() + args.duration if args.duration else None
+
+    def next_request() -> Optional[int]:
+        nonlocal sent
+        if stop_at is not None:
+            if time.monotonic() >= stop_at:
+                return None
+        elif sent >= args.requests:
+            return None
+        sent += 1
+        return sent
+
+    async def worker(worker_id: int, client: httpx.AsyncClient):
+        nonlocal partial
+        while (number := next_request()) is not None:
+            payload = {
+                "proposal_id": f"load-{number}",
+                # Unique notes so neither coalescing nor caching collapses the load
+                "survey_notes": f"{SURVEY_NOTES}\nReference: load request {number}",
+                "schema_id": args.schema_id
+            }
+            if args.priority:
+                payload["priority"] = args.priority
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/ai/generate-draft",
+                    json=payload,
+                    headers={"X-Client-ID": f"load-worker-{worker_id}"}
+                )
+                status = str(response.status_code)
+                if response.status_code == 200 and response.json().get("partial"):
+                    partial += 1
+            except httpx.TransportError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] += 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, client) for i in range(args.concurrency)))
+        wall_time = time.perf_counter() - started
+
+    return {
+        "requests": sum(statuses.values()),
+        "succeeded": len(latencies),
+        "partial": partial,
+        "statuses": dict(statuses),
+        "wall_time": wall_time,
+        "throughput": len(latencies) / wall_time if wall_time else 0.0,
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0)
+        }
+    }
+
+
+def print_report(results: Dict):
+    latency = results["latency"]
+    stub = results["stub"]
+    print(f"\nconcurrency {results['config']['concurrency']}, "
+          f"stub latency {results['config']['latency']}, "
+          f"error rate {results['config']['error_rate']}, rate-limit rate {results['config']['rate_limit_rate']}")
+    print(f"{'requests':<24}{results['requests']:>12}")
+    print(f"{'succeeded':<24}{results['succeeded']:>12}")
+    print(f"{'partial drafts':<24}{results['partial']:>12}")
+    print(f"{'statuses':<24}{json.dumps(results['statuses']):>12}")
+    print(f"{'wall time (s)':<24}{results['wall_time']:>12.2f}")
+    print(f"{'throughput (req/s)':<24}{results['throughput']:>12.2f}")
+    for name in ("mean", "p50", "p95", "p99", "max"):
+        print(f"{'latency ' + name + ' (ms)':<24}{latency[name] * 1000:>12.1f}")
+    print(f"{'stub calls':<24}{stub['requests']:>12}")
+    print(f"{'stub 500s / 429s':<24}{str(stub['errors']) + ' / ' + str(stub['rate_limited']):>12}")
+    print(f"{'stub mean latency (ms)':<24}{stub['mean_latency'] * 1000:>12.1f}")
+    if results.get("overhead_ms") is not None:
+        print(f"{'service overhead (ms)':<24}{results['overhead_ms']:>12.1f}")
+
+
+async def main_async(args: argparse.Namespace) -> Dict:
+    stub_port, service_port = free_port(), free_port()
+    stub = start_stub(args, stub_port)
+    service = None
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{stub_port}/stats", stub)
+        service = start_service(args, service_port, stub_port)
+        base_url = f"http://127.0.0.1:{service_port}"
+        await wait_until_ready(f"{base_url}/api/ai/health", service)
+
+        results = await run_load(args, base_url)
+
+        async with httpx.AsyncClient() as client:
+            results["stub"] = (await client.get(f"http://127.0.0.1:{stub_port}/stats")).json()
+            results["service_usage"] = (await client.get(f"{base_url}/api/ai/usage-stats")).json()
+    finally:
+        for process in (service, stub):
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    results["config"] = {
+        key: value for key, value in vars(args).items() if key not in ("json",)
+    }
+    # Stub latency per request; only meaningful when every call succeeded and nothing queued
+    if results["succeeded"] and results["stub"]["requests"]:
+        calls_per_request = results["stub"]["requests"] / results["requests"]
+        results["overhead_ms"] = (
+            results["latency"]["mean"] - calls_per_request * results["stub"]["mean_latency"]
+        ) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight requests")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--schema-id", default="default-proposal-schema")
+    parser.add_argument("--priority", choices=("interactive", "standard", "bulk"), default=None)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--latency", default="lognormal:800:0.4", help="Stub latency spec (see stub_llm_server.py)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of stub calls answered with 429")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="Completion tokens per stub response")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the stub's random draws")
+    parser.add_argument("--service-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the service (repeatable)")
+    parser.add_argument("--service-log-level", default="ERROR")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
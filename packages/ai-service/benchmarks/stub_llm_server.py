@@ -0,0 +1,151 @@
+"""
+Stub LLM Server - Local OpenAI-compatible chat completions endpoint for load tests.
+
+Serves POST /v1/chat/completions with configurable latency, error rates and token
+counts, so the service can be load tested without a paid provider (point the service
+at it with LLM_PROVIDER=openai and OPENAI_API_BASE=http://127.0.0.1:<port>/v1).
+Responses follow the structured output contract (content, confidence, rationale,
+sources, missing_info). GET /stats reports what was served.
+
+Latency specs (milliseconds):
+    fixed:800            always 800ms
+    uniform:200:1500     uniform between 200 and 1500ms
+    lognormal:800:0.5    lognormal with median 800ms and sigma 0.5
+    exponential:800      exponential with mean 800ms
+
+Usage:
+    python benchmarks/stub_llm_server.py --port 8100 --latency lognormal:800:0.5 --error-rate 0.02
+"""
+
+import sys
+import math
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FILLER_WORDS = (
+    "project scope deliverables timeline client requirements migration integration "
+    "phase milestone budget stakeholders objectives analysis implementation support"
+).split()
+
+
+def parse_latency(spec: str):
+    """Return a function sampling latency in seconds from a spec string"""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":") if value]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1]) / 1000
+    if kind == "exponential":
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """Build the stub application from command line options"""
+    app = FastAPI(title="Stub LLM Server")
+    sample_latency = parse_latency(args.latency)
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "latency_total": 0.0, "prompt_tokens": 0}
+
+    def completion_content(tokens: int) -> str:
+        words = [random.choice(FILLER_WORDS) for _ in range(max(1, tokens * 3 // 4))]
+        return json.dumps({
+            "content": "- " + " ".join(words),
+            "confidence": 0.8,
+            "rationale": "Stub response for load testing",
+            "sources": [],
+            "missing_info": []
+        })
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        latency = sample_latency()
+        stats["latency_total"] += latency
+        await asyncio.sleep(latency)
+
+        roll = random.random()
+        if roll < args.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(args.retry_after)},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}}
+            )
+        if roll < args.rate_limit_rate + args.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal error (stub)", "type": "server_error"}}
+            )
+
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+        prompt_tokens = prompt_chars // 4
+        stats["prompt_tokens"] += prompt_tokens
+        completion_tokens = min(args.completion_tokens, body.get("max_tokens") or args.completion_tokens)
+
+        return {
+            "id": f"chatcmpl-stub-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": completion_content(completion_tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": int(prompt_tokens * args.cached_fraction)}
+            }
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        served = stats["requests"]
+        return {
+            **stats,
+            "mean_latency": stats["latency_total"] / served if served else 0.0
+        }
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:800:0.4", help="Latency distribution spec (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    parser.add_argument("--cached-fraction", type=float, default=0.0, help="Share of prompt tokens reported as cached")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    parse_latency(args.latency)  # Fail fast on a bad spec
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
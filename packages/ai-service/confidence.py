@@ -0,0 +1,104 @@
+"""
+Confidence Scoring - Deterministic, local confidence scores for generated sections.
+Combines lexical support of the content in the survey notes, the rule pass ratio and
+the amount of missing information. No extra LLM calls; well under a millisecond per section.
+"""
+
+import os
+import logging
+from typing import Dict, Any, List
+
+from schema_manager import SectionRule
+from rule_engine import RuleEnforcementResult
+from survey_index import SurveyNotesIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Severity weight of a violation when computing the rule pass ratio (advisories do not count)
+SEVERITY_WEIGHTS = {"strict": 1.0, "warning": 0.5}
+
+
+class ConfidenceScorer:
+    """
+    Scores how well a generated section is supported by the survey notes.
+
+    score = support_weight * lexical_support + rules_weight * rule_pass_ratio
+            - missing_info_penalty * len(missing_info)   (penalty capped)
+    """
+
+    def __init__(self):
+        self.source = os.getenv("CONFIDENCE_SOURCE", "local")  # local | model
+        self.support_weight = float(os.getenv("CONFIDENCE_SUPPORT_WEIGHT", "0.6"))
+        self.rules_weight = 1.0 - self.support_weight
+        self.missing_info_penalty = float(os.getenv("CONFIDENCE_MISSING_INFO_PENALTY", "0.05"))
+        self.max_missing_info_penalty = 0.25
+
+    def lexical_support(self, content: str, notes_index: SurveyNotesIndex) -> float:
+        """
+        Share of the content's words and word pairs that also occur in the survey notes.
+        Bigrams catch specific phrases; unigrams keep short or reworded content fair.
+        """
+        tokens = tokenize(content)
+        if not tokens:
+            return 0.0
+
+        unique_terms = set(tokens)
+        unigram_support = len(unique_terms & notes_index.idf.keys()) / len(unique_terms)
+
+        pairs = set(zip(tokens, tokens[1:]))
+        if not pairs:
+            return unigram_support
+        bigram_support = len(pairs & notes_index.bigrams) / len(pairs)
+
+        return (unigram_support + bigram_support) / 2
+
+    @staticmethod
+    def rule_pass_ratio(enforcement_result: RuleEnforcementResult, rules: List[SectionRule]) -> float:
+        """Weighted share of rules without strict/warning violations"""
+        if not rules:
+            return 1.0
+
+        rule_penalties: Dict[str, float] = {}
+        for violation in enforcement_result.violations:
+            weight = SEVERITY_WEIGHTS.get(violation.severity, 0.0)
+            rule_penalties[violation.rule_id] = max(rule_penalties.get(violation.rule_id, 0.0), weight)
+
+        return max(0.0, 1.0 - sum(rule_penalties.values()) / len(rules))
+
+    def score(
+        self,
+        content: str,
+        notes_index: SurveyNotesIndex,
+        enforcement_result: RuleEnforcementResult,
+        rules: List[SectionRule],
+        missing_info: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Compute the confidence score for a section.
+
+        Args:
+            content: Final section content
+            notes_index: Index over the request's survey notes
+            enforcement_result: Rule enforcement result for the section
+            rules: Rules that were enforced
+            missing_info: Missing information reported for the section
+
+        Returns:
+            Dict with the score (0.0-1.0) and its components
+        """
+        support = self.lexical_support(content, notes_index)
+        pass_ratio = self.rule_pass_ratio(enforcement_result, rules)
+        penalty = min(self.max_missing_info_penalty, self.missing_info_penalty * len(missing_info))
+
+        score = self.support_weight * support + self.rules_weight * pass_ratio - penalty
+
+        return {
+            "score": round(max(0.0, min(1.0, score)), 3),
+            "lexical_support": round(support, 3),
+            "rule_pass_ratio": round(pass_ratio, 3),
+            "missing_info_penalty": round(penalty, 3)
+        }
+
+
+# Global confidence scorer instance
+confidence_scorer = ConfidenceScorer()
@@ -0,0 +1,302 @@
+"""
+Cost Budget - Token and dollar limits per draft, per proposal and per tenant per day.
+Every LLM call reserves its estimated spend (local prompt token count plus the full
+completion allowance, priced from the price table) before it is made, so retries and
+concurrent calls cannot overshoot a limit. Over-budget calls fail fast, or run on a
+cheaper model when one is configured and fits the dollar limit. Proposal and tenant
+spend is read from the usage ledger, so limits hold across restarts and workers.
+"""
+
+import os
+import time
+import sqlite3
+import calendar
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+from pricing import price_table
+from usage_ledger import usage_ledger, current_usage_tags
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("draft", "proposal", "tenant_daily")
+
+
+class BudgetExceeded(Exception):
+    """An LLM call would take a draft, proposal or tenant over its budget"""
+
+    def __init__(
+        self,
+        scope: str,
+        key: str,
+        unit: str,
+        limit: float,
+        projected: float,
+        retry_after: Optional[int] = None,
+        reason: Optional[str] = None
+    ):
+        self.scope = scope
+        self.key = key
+        self.unit = unit
+        self.limit = limit
+        self.projected = projected
+        self.retry_after = retry_after  # Seconds until the budget resets (daily budgets only)
+        super().__init__(
+            f"{scope.replace('_', ' ')} budget exceeded for {key}: " + (
+                reason or f"{projected:.4g} {unit} would exceed the limit of {limit:.4g} {unit}"
+            )
+        )
+
+
+class Spend:
+    """Settled and reserved spend of one budget scope"""
+
+    __slots__ = ("tokens", "cost", "pending_tokens", "pending_cost", "loaded_at")
+
+    def __init__(self, tokens: int = 0, cost: float = 0.0):
+        self.tokens = tokens
+        self.cost = cost
+        self.pending_tokens = 0
+        self.pending_cost = 0.0
+        self.loaded_at = time.monotonic()
+
+
+class Reservation:
+    """Estimated spend held for one LLM call; settle with the actual usage or release"""
+
+    def __init__(self, spends: List[Spend], tokens: int, cost: float, model: str, downgraded: bool = False):
+        self.spends = spends
+        self.tokens = tokens
+        self.cost = cost
+        self.model = model
+        self.downgraded = downgraded
+        self._open = True
+        for spend in spends:
+            spend.pending_tokens += tokens
+            spend.pending_cost += cost
+
+    def release(self):
+        """Give the reserved estimate back (call failed or was cancelled)"""
+        if not self._open:
+            return
+        self._open = False
+        for spend in self.spends:
+            spend.pending_tokens -= self.tokens
+            spend.pending_cost -= self.cost
+
+    def settle(self, tokens: int, cost: float):
+        """Replace the estimate with the actual usage"""
+        if not self._open:
+            return
+        self.release()
+        for spend in self.spends:
+            spend.tokens += tokens
+            spend.cost += cost
+
+
+# Spend of the draft being generated by the current task
+_draft_spend: ContextVar[Optional[Spend]] = ContextVar("draft_spend", default=None)
+
+
+def _utc_day() -> Tuple[str, float, int]:
+    """(date, start of day timestamp, seconds until the next day) in UTC"""
+    now = time.time()
+    day = time.strftime("%Y-%m-%d", time.gmtime(now))
+    start = calendar.timegm(time.strptime(day, "%Y-%m-%d"))
+    return day, start, int(start + 86400 - now) + 1
+
+
+class CostBudget:
+    """
+    Checks LLM calls against draft, proposal and tenant-per-day budgets (0 = no limit).
+
+    - Draft spend is tracked in memory for the current draft_scope block
+    - Proposal and tenant spend (from usage_tags) is loaded from the usage ledger and
+      refreshed every COST_BUDGET_REFRESH_SECONDS to include other workers' calls
+    - Downgrading to COST_BUDGET_DOWNGRADE_MODEL only helps dollar limits; token
+      limits fail fast
+    - Calls on a model without a price fail fast while a USD limit applies (fail closed)
+    """
+
+    def __init__(self):
+        self.limits: Dict[str, Tuple[int, float]] = {
+            "draft": (
+                int(os.getenv("COST_BUDGET_DRAFT_TOKENS", "0")),
+                float(os.getenv("COST_BUDGET_DRAFT_USD", "0"))
+            ),
+            "proposal": (
+                int(os.getenv("COST_BUDGET_PROPOSAL_TOKENS", "0")),
+                float(os.getenv("COST_BUDGET_PROPOSAL_USD", "0"))
+            ),
+            "tenant_daily": (
+                int(os.getenv("COST_BUDGET_TENANT_DAILY_TOKENS", "0")),
+                float(os.getenv("COST_BUDGET_TENANT_DAILY_USD", "0"))
+            )
+        }
+        self.downgrade_model = os.getenv("COST_BUDGET_DOWNGRADE_MODEL", "")
+        self.refresh_seconds = float(os.getenv("COST_BUDGET_REFRESH_SECONDS", "60"))
+        self.max_tracked = int(os.getenv("COST_BUDGET_MAX_TRACKED", "10000"))
+
+        # Proposal / (tenant, day) spend loaded from the ledger
+        self._tracked: "OrderedDict[Tuple[str, str], Spend]" = OrderedDict()
+
+        # Metrics
+        self.rejected = {scope: 0 for scope in SCOPES}
+        self.downgraded = 0
+
+        logger.info("Cost Budget initialized", extra={
+            "limits": {scope: list(limit) for scope, limit in self.limits.items()},
+            "downgrade_model": self.downgrade_model or None
+        })
+
+    def _limited(self, scope: str) -> bool:
+        tokens, usd = self.limits[scope]
+        return bool(tokens or usd)
+
+    @contextmanager
+    def draft_scope(self):
+        """Track the spend of LLM calls inside the block as one draft"""
+        token = _draft_spend.set(Spend())
+        try:
+            yield
+        finally:
+            _draft_spend.reset(token)
+
+    async def _load(self, scope: str, key: str, column: str, value: str, since: float) -> Spend:
+        """Spend of a proposal or tenant-day, refreshed from the ledger when stale"""
+        cache_key = (scope, key)
+        spend = self._tracked.get(cache_key)
+        if spend is not None and time.monotonic() - spend.loaded_at < self.refresh_seconds:
+            self._tracked.move_to_end(cache_key)
+            return spend
+
+        if spend is None:
+            spend = self._tracked[cache_key] = Spend()
+            spend.loaded_at = float("-inf")  # Concurrent callers load too until the first load lands
+            while len(self._tracked) > self.max_tracked:
+                self._tracked.popitem(last=False)
+        if usage_ledger.enabled:
+            # The ledger holds every settled call (including this worker's), so it replaces
+            # the in-memory total; calls settled while the query runs are added back
+            settled_tokens, settled_cost = spend.tokens, spend.cost
+            try:
+                tokens, cost = await usage_ledger.spend(since, **{column: value})
+                spend.tokens = tokens + spend.tokens - settled_tokens
+                spend.cost = cost + spend.cost - settled_cost
+            except sqlite3.Error as e:
+                logger.error(f"Failed to load {scope} spend for {key}: {str(e)}")
+        spend.loaded_at = time.monotonic()
+        return spend
+
+    async def _scoped_spends(self) -> List[Tuple[str, str, Spend, Optional[int]]]:
+        """(scope, key, spend, retry_after) for every limited scope the current call belongs to"""
+        spends = []
+        draft = _draft_spend.get()
+        if draft is not None and self._limited("draft"):
+            spends.append(("draft", "draft", draft, None))
+
+        tags = current_usage_tags()
+        proposal_id = tags.get("proposal_id")
+        if proposal_id and self._limited("proposal"):
+            spends.append((
+                "proposal", proposal_id,
+                await self._load("proposal", proposal_id, "proposal_id", proposal_id, 0.0),
+                None
+            ))
+
+        tenant_id = tags.get("tenant_id")
+        if tenant_id and self._limited("tenant_daily"):
+            day, day_start, until_reset = _utc_day()
+            key = f"{tenant_id}@{day}"
+            spends.append((
+                "tenant_daily", key,
+                await self._load("tenant_daily", key, "tenant_id", tenant_id, day_start),
+                until_reset
+            ))
+        return spends
+
+    def _violation(
+        self,
+        spends: List[Tuple[str, str, Spend, Optional[int]]],
+        tokens: int,
+        cost: float
+    ) -> Optional[BudgetExceeded]:
+        for scope, key, spend, retry_after in spends:
+            token_limit, usd_limit = self.limits[scope]
+            projected_tokens = spend.tokens + spend.pending_tokens + tokens
+            if token_limit and projected_tokens > token_limit:
+                return BudgetExceeded(scope, key, "tokens", token_limit, projected_tokens, retry_after)
+            projected_cost = spend.cost + spend.pending_cost + cost
+            if usd_limit and projected_cost > usd_limit:
+                return BudgetExceeded(scope, key, "USD", usd_limit, projected_cost, retry_after)
+        return None
+
+    async def reserve(self, prompt_tokens_estimate: int, max_tokens: int, model: str) -> Reservation:
+        """
+        Reserve the estimated spend of one LLM call.
+
+        Args:
+            prompt_tokens_estimate: Prompt tokens counted with the local tokenizer
+            max_tokens: Completion allowance (the worst case is reserved)
+            model: Model the call would use
+
+        Returns:
+            Reservation; its model is the downgrade model if the call only fits on that
+
+        Raises:
+            BudgetExceeded: If the call does not fit the budget on any allowed model
+        """
+        spends = await self._scoped_spends()
+        if not spends:
+            return Reservation([], 0, 0.0, model)
+
+        # An unpriced model would cost 0 and pass every USD limit - fail closed instead
+        if price_table.get(model) is None:
+            for scope, key, _, _ in spends:
+                usd_limit = self.limits[scope][1]
+                if usd_limit:
+                    self.rejected[scope] += 1
+                    raise BudgetExceeded(
+                        scope, key, "USD", usd_limit, float("inf"),
+                        reason=f"model {model} has no price, so its cost cannot be checked"
+                    )
+
+        tokens = prompt_tokens_estimate + max_tokens
+        cost = price_table.cost(model, prompt_tokens_estimate, max_tokens)
+        violation = self._violation(spends, tokens, cost)
+        if violation is None:
+            return Reservation([spend for _, _, spend, _ in spends], tokens, cost, model)
+
+        if self.downgrade_model and model != self.downgrade_model and violation.unit == "USD" \
+                and price_table.get(self.downgrade_model) is not None:
+            cheaper_cost = price_table.cost(self.downgrade_model, prompt_tokens_estimate, max_tokens)
+            if self._violation(spends, tokens, cheaper_cost) is None:
+                self.downgraded += 1
+                logger.warning(f"Downgrading LLM call to {self.downgrade_model}: {str(violation)}")
+                return Reservation(
+                    [spend for _, _, spend, _ in spends], tokens, cheaper_cost, self.downgrade_model,
+                    downgraded=True
+                )
+
+        self.rejected[violation.scope] += 1
+        logger.warning(f"LLM call rejected: {str(violation)}")
+        raise violation
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limits": {
+                scope: {"tokens": tokens, "usd": usd}
+                for scope, (tokens, usd) in self.limits.items()
+            },
+            "downgrade_model": self.downgrade_model or None,
+            "rejected": dict(self.rejected),
+            "downgraded": self.downgraded,
+            "tracked": len(self._tracked)
+        }
+
+
+# Global cost budget instance
+cost_budget = CostBudget()
@@ -0,0 +1,80 @@
+"""
+Deadlines - End-to-end time budget for a draft generation request.
+The deadline is set once per request and read by the LLM adapter (attempt timeouts,
+backoff, scheduler wait) and the section loop, so no work starts that cannot finish
+before the caller gives up.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Default budget for synchronous generate-draft requests (0 = no deadline)
+DRAFT_DEADLINE_SECONDS = float(os.getenv("DRAFT_DEADLINE_SECONDS", "0"))
+# Do not start an LLM attempt with less time than this left
+DEADLINE_MIN_CALL_SECONDS = float(os.getenv("DEADLINE_MIN_CALL_SECONDS", "1.0"))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the remaining time budget cannot cover the next step"""
+
+
+class Deadline:
+    """Absolute deadline on the monotonic clock"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)"""
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being processed by the current task (None if unbounded)"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Apply a deadline to the work done inside the block (including tasks it creates)"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+class SectionTimeEstimator:
+    """
+    Moving average of section generation time, used to decide whether a section
+    can still finish within a request's remaining budget.
+    """
+
+    def __init__(self):
+        self.estimate_seconds = float(os.getenv("DEADLINE_SECTION_ESTIMATE", "5.0"))
+        self.alpha = 0.2
+
+    def observe(self, seconds: float):
+        """Record the duration of a generated section"""
+        self.estimate_seconds += self.alpha * (seconds - self.estimate_seconds)
+
+    def estimate(self) -> float:
+        """Expected duration of the next section"""
+        return self.estimate_seconds
+
+
+# Global section time estimator instance
+section_time_estimator = SectionTimeEstimator()
@@ -0,0 +1,224 @@
+"""
+Job Manager - Asynchronous draft generation jobs on a bounded worker pool.
+Long drafts run in the background instead of holding an HTTP connection open for the
+whole generation; clients poll for status and partial sections, and can cancel a job,
+which cancels its outstanding LLM calls.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a draft job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+class DraftJob:
+    """A draft generation job and its progress"""
+
+    def __init__(
+        self,
+        runner: Callable[["DraftJob"], Awaitable[Any]],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.id = str(uuid.uuid4())
+        self.runner = runner
+        self.metadata = metadata or {}
+        self.status = JobStatus.QUEUED
+        self.sections: List[Any] = []
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def add_section(self, section: Any):
+        """Record a completed section (partial results are visible while running)"""
+        self.sections.append(section)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            **self.metadata,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "sections_completed": len(self.sections),
+            "sections": [s.model_dump() if hasattr(s, "model_dump") else s for s in self.sections],
+            "result": self.result.model_dump() if hasattr(self.result, "model_dump") else self.result,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs draft jobs on a fixed number of workers fed by a bounded queue.
+    Finished jobs are kept for a retention period so clients can collect results.
+    """
+
+    def __init__(self):
+        self.worker_count = int(os.getenv("JOB_WORKERS", "4"))
+        self.queue_size = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+        self.retention = float(os.getenv("JOB_RETENTION", "3600"))
+
+        self.jobs: "OrderedDict[str, DraftJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        logger.info("Job Manager initialized", extra={
+            "workers": self.worker_count,
+            "queue_size": self.queue_size
+        })
+
+    async def start(self):
+        """Start the worker pool (called on application startup)"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"draft-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} draft job workers")
+
+    async def stop(self):
+        """Cancel running jobs and stop the workers (called on shutdown)"""
+        for job in self.jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _prune(self):
+        """Drop finished jobs past the retention period"""
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(
+        self,
+        runner: Callable[[DraftJob], Awaitable[Any]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> DraftJob:
+        """
+        Queue a job.
+
+        Args:
+            runner: Coroutine function doing the work; receives the job for progress updates
+            metadata: Extra fields reported with the job status
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobQueueFullError: If the queue is full (or the workers are not running)
+        """
+        if self._queue is None:
+            raise JobQueueFullError("Job workers are not running")
+
+        self._prune()
+        job = DraftJob(runner, metadata)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self.queue_size} jobs)")
+
+        self.jobs[job.id] = job
+        logger.info("Draft job queued", extra={"job_id": job.id, "queue_depth": self._queue.qsize()})
+        return job
+
+    def get(self, job_id: str) -> Optional[DraftJob]:
+        """Get a job by ID"""
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[DraftJob]:
+        """
+        Cancel a job. Queued jobs never start; running jobs have their task cancelled,
+        which cancels outstanding LLM calls.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        else:
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+
+        logger.info("Draft job cancellation requested", extra={"job_id": job_id})
+        return job
+
+    async def _worker(self, worker_id: int):
+        """Take jobs off the queue and run them one at a time"""
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == JobStatus.CANCELLED:
+                    continue
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: DraftJob):
+        """Run one job in its own task so it can be cancelled independently of the worker"""
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        job.task = asyncio.ensure_future(job.runner(job))
+
+        # Wait without propagating the job's cancellation into the worker
+        await asyncio.wait({job.task})
+
+        if job.task.cancelled():
+            job.status = JobStatus.CANCELLED
+        elif job.task.exception() is not None:
+            error = job.task.exception()
+            job.status = JobStatus.FAILED
+            job.error = getattr(error, "detail", None) or str(error)
+        else:
+            job.status = JobStatus.COMPLETED
+            job.result = job.task.result()
+
+        job.finished_at = time.time()
+        logger.info("Draft job finished", extra={
+            "job_id": job.id,
+            "status": job.status.value,
+            "elapsed_time": job.finished_at - job.started_at
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue and job metrics"""
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self.jobs.values():
+            counts[job.status.value] += 1
+        return {
+            "workers": len(self._workers),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "jobs": counts
+        }
+
+
+# Global job manager instance
+job_manager = JobManager()
@@ -0,0 +1,245 @@
+"""
+JSON Extraction - Tolerant, incremental extraction of structured LLM output.
+Finds the first complete JSON object in text that may contain code fences, prose or
+a truncated tail, and exposes top-level fields as soon as their values close, so
+chunks from a streamed completion can be fed as they arrive.
+"""
+
+import re
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# String body up to the closing quote (or a dangling backslash at the end of the buffer)
+STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONExtractor:
+    """
+    Incremental scanner for the first JSON object in LLM output.
+
+    Usage:
+        extractor = IncrementalJSONExtractor()
+        for chunk in stream:
+            for key in extractor.feed(chunk):
+                ...  # extractor.fields[key] just closed
+        parsed = extractor.finish()
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._reset_candidate()
+
+    def _reset_candidate(self):
+        """Forget the current candidate object"""
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Top-level member state: key | key_str | colon | value | value_str | value_nested | value_scalar | comma
+        self._expect = "key"
+        self._key_start = 0
+        self._key: Optional[str] = None
+        self._value_start = 0
+
+    @property
+    def done(self) -> bool:
+        """Whether a complete object has been found"""
+        return self.result is not None
+
+    def _restart_after_candidate(self):
+        """Current candidate is not valid JSON - rescan from the character after its '{'"""
+        restart_at = self._start + 1
+        self.fields = {}
+        self._reset_candidate()
+        self._pos = restart_at
+
+    def _close_value(self, end: int, closed: List[str]) -> bool:
+        """Decode a completed top-level value; returns False if it is not valid JSON"""
+        try:
+            value = json.loads(self.text[self._value_start:end])
+        except ValueError:
+            return False
+        self.fields[self._key] = value
+        closed.append(self._key)
+        self._expect = "comma"
+        return True
+
+    def _close_root(self, end: int):
+        """Root object closed - decode it as a whole (fields are the fallback)"""
+        try:
+            parsed = json.loads(self.text[self._start:end])
+        except ValueError:
+            parsed = None
+        self.result = parsed if isinstance(parsed, dict) else dict(self.fields)
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add a chunk of output and scan it.
+
+        Args:
+            chunk: Next piece of LLM output
+
+        Returns:
+            Keys of top-level fields whose values closed in this chunk
+        """
+        closed: List[str] = []
+        if self.done:
+            return closed
+
+        self.text += chunk
+        text = self.text
+        length = len(text)
+        pos = self._pos
+
+        while pos < length and not self.done:
+            # Looking for the opening brace of a candidate object
+            if self._start is None:
+                brace = text.find("{", pos)
+                if brace < 0:
+                    pos = length
+                    break
+                self._start = brace
+                self._depth = 1
+                pos = brace + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                pos = STRING_BODY.match(text, pos).end()
+                if pos >= length:
+                    break
+                if text[pos] == "\\":
+                    # Escape split across chunks - skip its second half on the next feed
+                    self._escape = True
+                    pos += 1
+                    continue
+                # Closing quote
+                self._in_string = False
+                pos += 1
+                if self._depth == 1:
+                    if self._expect == "key_str":
+                        try:
+                            self._key = json.loads(text[self._key_start:pos])
+                            self._expect = "colon"
+                        except ValueError:
+                            self._restart_after_candidate()
+                            pos = self._pos
+                    elif self._expect == "value_str" and not self._close_value(pos, closed):
+                        self._restart_after_candidate()
+                        pos = self._pos
+                continue
+
+            char = text[pos]
+            top_level = self._depth == 1
+            valid = True
+
+            if char == '"':
+                self._in_string = True
+                if top_level:
+                    if self._expect == "key":
+                        self._key_start = pos
+                        self._expect = "key_str"
+                    elif self._expect == "value":
+                        self._value_start = pos
+                        self._expect = "value_str"
+                    else:
+                        valid = False
+
+            elif char in "{[":
+                if top_level:
+                    if self._expect == "value":
+                        self._value_start = pos
+                        self._expect = "value_nested"
+                    else:
+                        valid = False
+                self._depth += 1
+
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value_nested":
+                    valid = self._close_value(pos + 1, closed)
+                elif self._depth == 0:
+                    if char != "}" or self._expect not in ("key", "comma", "value_scalar"):
+                        valid = False
+                    elif self._expect == "value_scalar":
+                        valid = self._close_value(pos, closed)
+                    if valid:
+                        self._close_root(pos + 1)
+
+            elif top_level:
+                if char == ":":
+                    if self._expect == "colon":
+                        self._expect = "value"
+                    else:
+                        valid = False
+                elif char == ",":
+                    if self._expect == "value_scalar":
+                        valid = self._close_value(pos, closed)
+                    elif self._expect != "comma":
+                        valid = False
+                    if valid:
+                        self._expect = "key"
+                elif char not in WHITESPACE:
+                    if self._expect == "value":
+                        self._value_start = pos
+                        self._expect = "value_scalar"
+                    elif self._expect != "value_scalar":
+                        valid = False
+
+            if not valid:
+                self._restart_after_candidate()
+                pos = self._pos
+                continue
+
+            pos += 1
+
+        self._pos = pos
+        return closed
+
+    def _partial_string_value(self) -> Optional[str]:
+        """Decode an unterminated top-level string value (output cut off mid-value)"""
+        raw = self.text[self._value_start:]
+        if self._escape:
+            raw = raw[:-1]
+        try:
+            return json.loads(raw + '"')
+        except ValueError:
+            # A cut-off \\uXXXX escape - drop the dangling escape sequence
+            try:
+                return json.loads(re.sub(r'\\u[0-9a-fA-F]{0,3}$', '', raw) + '"')
+            except ValueError:
+                return None
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """
+        Finish extraction.
+
+        Returns:
+            The first complete JSON object, or for truncated output the top-level fields
+            that closed (plus a partially streamed string value), or None if no object was found
+        """
+        if self.result is not None:
+            return self.result
+
+        if self._start is None:
+            return None
+
+        partial = dict(self.fields)
+        if self._depth == 1 and self._expect == "value_str" and self._in_string and self._key is not None:
+            value = self._partial_string_value()
+            if value is not None:
+                partial[self._key] = value
+
+        return partial or None
+
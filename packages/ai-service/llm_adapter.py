@@ -11,17 +11,36 @@ from enum import Enum
 import time
 
 # LLM Provider SDKs
-from openai import AsyncOpenAI, OpenAIError
-from groq import AsyncGroq, GroqError
+from openai import AsyncOpenAI, OpenAIError, RateLimitError as OpenAIRateLimitError
+from groq import AsyncGroq, GroqError, RateLimitError as GroqRateLimitError
+
+from semantic_cache import semantic_cache
+from llm_scheduler import llm_scheduler, current_call_context, QueueTimeout
+from deadlines import current_deadline, DeadlineExceeded, DEADLINE_MIN_CALL_SECONDS
+from tracing import tracer
+from llm_recording import llm_recorder, ReplayClient, ReplayMissError
+from usage_ledger import usage_ledger
+from pricing import price_table
+from cost_budget import cost_budget
+from token_budget import token_budget_planner
+from metrics import (
+    current_metric_labels, LLM_REQUEST_DURATION, LLM_QUEUE_WAIT,
+    LLM_RETRIES, LLM_CACHE_HITS, LLM_TOKENS, LLM_PROMPT_ESTIMATE_RATIO
+)
 
 logger = logging.getLogger(__name__)
 
+# Chat formatting tokens the provider adds per message, plus the reply primer (approximate)
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMER_TOKENS = 3
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers"""
     OPENAI = "openai"
     GROQ = "groq"
     AZURE = "azure"
+    REPLAY = "replay"  # Recorded traffic (see llm_recording)
 
 
 class LLMAdapter:
@@ -36,16 +55,31 @@ class LLMAdapter:
         self.timeout = int(os.getenv("LLM_TIMEOUT", "30"))
         self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "500"))
         self.temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+        self.json_mode_enabled = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
         
         # Initialize clients based on provider
         self.client = None
         self.model = None
         self._initialize_client()
         
-        # Token usage tracking
+        # Token usage tracking (as reported by the provider)
         self.total_tokens_used = 0
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+        self.total_cached_tokens = 0
         self.total_cost = 0.0
         
+        # Local tokenizer estimates of prompt tokens vs. provider-reported prompt tokens
+        self.estimated_prompt_tokens = 0
+        self.estimate_compared_calls = 0
+        self.estimate_abs_error = 0
+        
+        # Spend on requests abandoned by their caller (disconnect or cancellation)
+        self.abandoned_requests = 0
+        self.abandoned_tokens = 0
+        self.abandoned_cost = 0.0
+        self.cancelled_calls = 0
+        
         logger.info(f"LLM Adapter initialized", extra={
             "provider": self.provider,
             "model": self.model,
@@ -87,8 +121,21 @@ class LLMAdapter:
                 api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2023-05-15")
             )
             self.model = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+            # Deployment names are arbitrary - price them as the model they serve
+            base_model = os.getenv("AZURE_OPENAI_BASE_MODEL")
+            if base_model and self.model:
+                price_table.alias(self.model, base_model)
             logger.info("Initialized Azure OpenAI client with REAL API key")
         
+        elif self.provider == LLMProvider.REPLAY:
+            replay_file = os.getenv("LLM_REPLAY_FILE")
+            if not replay_file:
+                raise ValueError("LLM_REPLAY_FILE not found in environment variables")
+            
+            self.client = ReplayClient(replay_file)
+            self.model = os.getenv("LLM_REPLAY_MODEL") or self.client.model
+            logger.info("Initialized replay client from recorded LLM traffic")
+        
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
     
@@ -97,7 +144,10 @@ class LLMAdapter:
         prompt: str,
         system_message: Optional[str] = None,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        json_mode: bool = False,
+        cache_namespace: Optional[str] = None,
+        priority: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate completion from REAL LLM API with retry logic.
@@ -107,16 +157,27 @@ class LLMAdapter:
             system_message: System instructions
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
+            json_mode: Request a JSON object response (provider JSON mode, if enabled)
+            cache_namespace: Scope for the semantic cache (e.g. schema section); None disables it
+            priority: Scheduling class (interactive/standard/bulk); defaults to llm_scheduler.context
         
         Returns:
             Dict containing:
                 - content: Generated text
+                - finish_reason: Why generation stopped ("length" = cut off at max_tokens)
                 - tokens_used: Token count
+                - prompt_tokens: Prompt tokens (including cached)
+                - completion_tokens: Completion tokens
+                - cached_tokens: Prompt tokens served from the provider's prefix cache
+                - prompt_tokens_estimate: Local tokenizer estimate of the prompt tokens
                 - estimated_cost: Cost estimate
                 - model: Model used
                 - provider: Provider used
         
         Raises:
+            DeadlineExceeded: If the request deadline leaves no time for another attempt
+            QueueTimeout: If no scheduler slot was granted within LLM_QUEUE_TIMEOUT
+            BudgetExceeded: If the call would exceed a draft, proposal or tenant budget
             Exception: If all retries fail
         """
         max_tokens = max_tokens or self.max_tokens
@@ -127,65 +188,180 @@ class LLMAdapter:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": prompt})
         
-        # Retry logic with exponential backoff
-        for attempt in range(self.max_retries):
-            try:
-                start_time = time.time()
-                
-                logger.info(f"Making REAL LLM API call (attempt {attempt + 1}/{self.max_retries})", extra={
+        request_params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        # OpenAI, Azure OpenAI and Groq all accept the json_object response format
+        if json_mode and self.json_mode_enabled:
+            request_params["response_format"] = {"type": "json_object"}
+        
+        # Metric labels: provider/model plus schema/section set by the caller
+        labels = self._metric_labels()
+        
+        # Serve identical or near-identical prompts from the semantic cache
+        if cache_namespace:
+            cache_namespace = f"{cache_namespace}|{self.model}|{max_tokens}|{temperature}|{json_mode}"
+            cache_text = f"{system_message or ''}\n{prompt}"
+            cached = semantic_cache.lookup(cache_namespace, cache_text)
+            if cached is not None:
+                logger.info("Semantic cache hit - skipping LLM API call", extra={
                     "provider": self.provider,
                     "model": self.model,
-                    "prompt_length": len(prompt),
-                    "mock_mode": False
+                    "similarity": cached["cache_similarity"]
                 })
-                
-                # Make REAL API call (NO mocks)
-                response = await asyncio.wait_for(
-                    self.client.chat.completions.create(
-                        model=self.model,
-                        messages=messages,
-                        max_tokens=max_tokens,
-                        temperature=temperature
-                    ),
-                    timeout=self.timeout
+                LLM_CACHE_HITS.inc(**labels)
+                tracer.add_event("semantic_cache_hit", similarity=cached["cache_similarity"])
+                cached.update({
+                    "tokens_used": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+                    "estimated_cost": 0.0, "elapsed_time": 0.0
+                })
+                usage_ledger.record(
+                    self.provider.value, self.model,
+                    schema_id=labels.get("schema"), section=labels.get("section"), cache_hit=True
                 )
-                
-                elapsed_time = time.time() - start_time
+                return cached
+        
+        # Fair-share cost of the call: prompt tokens (local tokenizer) plus the completion allowance
+        prompt_tokens_estimate = self._estimate_prompt_tokens(messages)
+        estimated_tokens = prompt_tokens_estimate + max_tokens
+        
+        # Request deadline (if any) bounds queueing, each attempt and backoff
+        deadline = current_deadline()
+        
+        # Retry logic with exponential backoff
+        for attempt in range(self.max_retries):
+            if deadline and deadline.remaining() < DEADLINE_MIN_CALL_SECONDS:
+                raise DeadlineExceeded("Request deadline reached before LLM call")
+            
+            # Every attempt (retries included) reserves its estimated spend; may switch to a cheaper model
+            reservation = await cost_budget.reserve(prompt_tokens_estimate, max_tokens, self.model)
+            model = request_params["model"] = labels["model"] = reservation.model
+            
+            start_time = None
+            try:
+                with tracer.span("llm.attempt", attempt=attempt + 1, provider=self.provider.value, model=model) as attempt_span:
+                    # Wait for a dispatch slot (priority, fair share and provider rate limits);
+                    # queueing is bounded by the deadline / LLM_QUEUE_TIMEOUT, not LLM_TIMEOUT
+                    queue_timeout = deadline.remaining() if deadline else None
+                    async with llm_scheduler.slot(estimated_tokens, priority, timeout=queue_timeout) as queue_wait:
+                        LLM_QUEUE_WAIT.observe(queue_wait, priority=priority or current_call_context()[0], **labels)
+                        timeout = min(self.timeout, deadline.remaining()) if deadline else self.timeout
+                        start_time = time.time()
+                        
+                        # Per-attempt detail is DEBUG (sampled - see log_pipeline); the result is logged at INFO
+                        logger.debug(f"Making REAL LLM API call (attempt {attempt + 1}/{self.max_retries})", extra={
+                            "provider": self.provider,
+                            "model": model,
+                            "prompt_length": len(prompt),
+                            "queue_wait": queue_wait,
+                            "mock_mode": False
+                        })
+                        
+                        # Make REAL API call (NO mocks)
+                        try:
+                            response = await asyncio.wait_for(
+                                self.client.chat.completions.create(**request_params),
+                                timeout=timeout
+                            )
+                        except asyncio.CancelledError:
+                            # Caller went away mid-call; the provider may still bill the prompt
+                            self.cancelled_calls += 1
+                            raise
+                        
+                        elapsed_time = time.time() - start_time
+                        if self.provider != LLMProvider.REPLAY:
+                            llm_recorder.record(request_params, response, elapsed_time, self.provider.value)
+                        usage = self._extract_usage(response)
+                        attempt_span.set_attributes(
+                            queue_wait=queue_wait,
+                            tokens_used=usage["total_tokens"],
+                            prompt_tokens=usage["prompt_tokens"],
+                            completion_tokens=usage["completion_tokens"],
+                            cached_tokens=usage["cached_tokens"],
+                            prompt_tokens_estimate=prompt_tokens_estimate
+                        )
                 
                 # Extract response data
                 content = response.choices[0].message.content
-                tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else 0
+                finish_reason = getattr(response.choices[0], "finish_reason", None)
+                tokens_used = usage["total_tokens"]
+                cached_tokens = usage["cached_tokens"]
+                llm_scheduler.record_usage(estimated_tokens, tokens_used)
                 
-                # Calculate estimated cost (rough estimates)
-                estimated_cost = self._calculate_cost(tokens_used)
+                # Cost from the model's prompt / cached prompt / completion prices
+                estimated_cost = self._calculate_cost(usage, model)
+                reservation.settle(tokens_used, estimated_cost)
                 
                 # Track usage
                 self.total_tokens_used += tokens_used
+                self.total_prompt_tokens += usage["prompt_tokens"]
+                self.total_completion_tokens += usage["completion_tokens"]
+                self.total_cached_tokens += cached_tokens
                 self.total_cost += estimated_cost
+                self._compare_prompt_estimate(prompt_tokens_estimate, usage["prompt_tokens"], labels)
+                LLM_REQUEST_DURATION.observe(elapsed_time, outcome="success", **labels)
+                for kind in ("prompt", "completion", "cached"):
+                    LLM_TOKENS.inc(usage[f"{kind}_tokens"], kind=kind, **labels)
+                LLM_TOKENS.inc(tokens_used, kind="total", **labels)
+                usage_ledger.record(
+                    self.provider.value, model,
+                    schema_id=labels.get("schema"),
+                    section=labels.get("section"),
+                    prompt_tokens=usage["prompt_tokens"],
+                    completion_tokens=usage["completion_tokens"],
+                    cached_tokens=cached_tokens,
+                    total_tokens=tokens_used,
+                    cost=estimated_cost,
+                    latency=elapsed_time
+                )
                 
                 logger.info("REAL LLM API call successful", extra={
                     "provider": self.provider,
-                    "model": self.model,
+                    "model": model,
+                    "downgraded": reservation.downgraded,
                     "tokens_used": tokens_used,
+                    "prompt_tokens": usage["prompt_tokens"],
+                    "prompt_tokens_estimate": prompt_tokens_estimate,
+                    "completion_tokens": usage["completion_tokens"],
+                    "cached_tokens": cached_tokens,
                     "estimated_cost": estimated_cost,
                     "elapsed_time": elapsed_time,
+                    "queue_wait": queue_wait,
                     "attempt": attempt + 1,
                     "mock_mode": False
                 })
                 
-                return {
+                result = {
                     "content": content,
+                    "finish_reason": finish_reason,
                     "tokens_used": tokens_used,
+                    "prompt_tokens": usage["prompt_tokens"],
+                    "completion_tokens": usage["completion_tokens"],
+                    "cached_tokens": cached_tokens,
+                    "prompt_tokens_estimate": prompt_tokens_estimate,
                     "estimated_cost": estimated_cost,
-                    "model": self.model,
+                    "model": model,
                     "provider": self.provider.value,
                     "elapsed_time": elapsed_time
                 }
                 
+                # Downgraded completions would be served later as if from the configured model
+                if cache_namespace and not reservation.downgraded:
+                    semantic_cache.store(cache_namespace, cache_text, result)
+                
+                return result
+                
             except asyncio.TimeoutError:
                 logger.warning(f"LLM API call timed out (attempt {attempt + 1}/{self.max_retries})")
+                self._observe_failed_attempt(start_time, "timeout", labels)
+                if deadline and deadline.remaining() < DEADLINE_MIN_CALL_SECONDS:
+                    raise DeadlineExceeded("Request deadline reached during LLM call")
                 if attempt == self.max_retries - 1:
                     raise Exception(f"LLM API call timed out after {self.max_retries} attempts")
+                LLM_RETRIES.inc(reason="timeout", **labels)
                 await self._exponential_backoff(attempt)
                 
             except (OpenAIError, GroqError) as e:
@@ -193,53 +369,157 @@ class LLMAdapter:
                     "error": str(e),
                     "provider": self.provider
                 })
+                rate_limited = isinstance(e, (OpenAIRateLimitError, GroqRateLimitError))
+                self._observe_failed_attempt(start_time, "rate_limited" if rate_limited else "api_error", labels)
+                if rate_limited:
+                    # Hold back all queued calls, not just this one
+                    llm_scheduler.pause(self._retry_after(e, attempt))
                 if attempt == self.max_retries - 1:
                     raise Exception(f"LLM API call failed after {self.max_retries} attempts: {str(e)}")
+                LLM_RETRIES.inc(reason="rate_limited" if rate_limited else "api_error", **labels)
                 await self._exponential_backoff(attempt)
                 
+            except QueueTimeout:
+                # Never reached the provider - not a failed attempt, and requeueing would wait again
+                if deadline and deadline.remaining() < DEADLINE_MIN_CALL_SECONDS:
+                    raise DeadlineExceeded("Request deadline reached while waiting for an LLM slot")
+                raise
+            
+            except ReplayMissError:
+                # Deterministic - retrying would miss again
+                raise
+                
             except Exception as e:
                 logger.error(f"Unexpected error in LLM API call", extra={
                     "error": str(e),
                     "provider": self.provider
                 })
+                self._observe_failed_attempt(start_time, "error", labels)
                 if attempt == self.max_retries - 1:
                     raise
+                LLM_RETRIES.inc(reason="error", **labels)
                 await self._exponential_backoff(attempt)
+            
+            finally:
+                # No-op once settled; failed or cancelled attempts give their estimate back
+                reservation.release()
+    
+    def _metric_labels(self) -> Dict[str, str]:
+        """Provider/model labels plus the caller's schema/section labels"""
+        return {"provider": self.provider.value, "model": self.model, **current_metric_labels()}
+    
+    @staticmethod
+    def _observe_failed_attempt(start_time: Optional[float], outcome: str, labels: Dict[str, str]):
+        """Record the latency of a failed attempt (if it got past the scheduler)"""
+        if start_time is not None:
+            LLM_REQUEST_DURATION.observe(time.time() - start_time, outcome=outcome, **labels)
+    
+    @staticmethod
+    def _extract_usage(response) -> Dict[str, int]:
+        """Prompt, completion, cached (prefix cache hits) and total tokens reported by the provider"""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        if isinstance(details, dict):
+            cached_tokens = details.get("cached_tokens") or 0
+        else:
+            cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "total_tokens": getattr(usage, "total_tokens", 0) or prompt_tokens + completion_tokens
+        }
+    
+    @staticmethod
+    def _estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        """Prompt tokens of the chat messages counted with the local tokenizer"""
+        return sum(
+            token_budget_planner.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            for message in messages
+        ) + REPLY_PRIMER_TOKENS
+    
+    def _compare_prompt_estimate(self, estimate: int, actual: int, labels: Dict[str, str]):
+        """Track how far local prompt token estimates are from the provider's counts"""
+        if not actual:
+            return
+        self.estimated_prompt_tokens += estimate
+        self.estimate_compared_calls += 1
+        self.estimate_abs_error += abs(actual - estimate)
+        if estimate:
+            LLM_PROMPT_ESTIMATE_RATIO.observe(
+                actual / estimate, provider=labels["provider"], model=labels["model"]
+            )
+    
+    @staticmethod
+    def _retry_after(error: Exception, attempt: int) -> float:
+        """Seconds to wait after a rate-limit error (Retry-After header, else backoff)"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return min(2 ** attempt, 10)
     
     async def _exponential_backoff(self, attempt: int):
-        """Exponential backoff between retries"""
+        """Exponential backoff between retries (skipped if the request deadline would pass)"""
         wait_time = min(2 ** attempt, 10)  # Max 10 seconds
-        logger.info(f"Waiting {wait_time}s before retry")
-        await asyncio.sleep(wait_time)
+        deadline = current_deadline()
+        if deadline and deadline.remaining() < wait_time + DEADLINE_MIN_CALL_SECONDS:
+            raise DeadlineExceeded("Request deadline leaves no time to retry the LLM call")
+        logger.debug(f"Waiting {wait_time}s before retry")
+        with tracer.span("llm.backoff", attempt=attempt + 1, wait_time=wait_time):
+            await asyncio.sleep(wait_time)
     
-    def _calculate_cost(self, tokens: int) -> float:
+    def _calculate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
         """
-        Calculate estimated cost based on tokens and provider.
-        Rough estimates - actual costs may vary.
+        Calculate estimated cost from the model's price table entry (see pricing).
+        Cached prompt tokens are billed at the model's cached input rate.
         """
-        if self.provider == LLMProvider.GROQ:
-            # Groq is free for now, but track as if it costs
-            return tokens * 0.0001 / 1000  # $0.0001 per 1K tokens (hypothetical)
-        
-        elif self.provider == LLMProvider.OPENAI:
-            if "gpt-4" in self.model:
-                return tokens * 0.03 / 1000  # $0.03 per 1K tokens
-            else:  # gpt-3.5-turbo
-                return tokens * 0.002 / 1000  # $0.002 per 1K tokens
-        
-        elif self.provider == LLMProvider.AZURE:
-            # Azure pricing varies by deployment
-            return tokens * 0.002 / 1000
-        
-        return 0.0
+        return price_table.cost(
+            model or self.model,
+            prompt_tokens=usage["prompt_tokens"],
+            completion_tokens=usage["completion_tokens"],
+            cached_tokens=usage["cached_tokens"]
+        )
+    
+    def record_abandoned(self, tokens: int, cost: float):
+        """Record tokens spent on a request whose result nobody will read"""
+        self.abandoned_requests += 1
+        self.abandoned_tokens += tokens
+        self.abandoned_cost += cost
     
     def get_usage_stats(self) -> Dict[str, Any]:
         """Get cumulative usage statistics"""
         return {
             "total_tokens_used": self.total_tokens_used,
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "total_completion_tokens": self.total_completion_tokens,
+            "total_cached_tokens": self.total_cached_tokens,
             "total_cost": round(self.total_cost, 4),
+            "prompt_estimate": {
+                "calls": self.estimate_compared_calls,
+                "estimated_prompt_tokens": self.estimated_prompt_tokens,
+                "actual_prompt_tokens": self.total_prompt_tokens,
+                "mean_abs_error": round(self.estimate_abs_error / self.estimate_compared_calls, 1)
+                if self.estimate_compared_calls else 0.0,
+                "tokenizer": token_budget_planner.tokenizer
+            },
+            "pricing": price_table.get_stats(),
+            "budgets": cost_budget.get_stats(),
+            "abandoned": {
+                "requests": self.abandoned_requests,
+                "tokens": self.abandoned_tokens,
+                "cost": round(self.abandoned_cost, 4),
+                "cancelled_calls": self.cancelled_calls
+            },
             "provider": self.provider.value,
-            "model": self.model
+            "model": self.model,
+            "semantic_cache": semantic_cache.get_stats(),
+            "scheduler": llm_scheduler.get_stats(),
+            "recording": llm_recorder.get_stats(),
+            "replay": self.client.get_stats() if isinstance(self.client, ReplayClient) else None
         }
     
     async def generate_with_fallback(
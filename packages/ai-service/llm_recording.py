@@ -0,0 +1,247 @@
+"""
+LLM Recording - Capture LLM traffic to a file and replay it offline.
+In capture mode every successful completion (prompt, parameters, response, usage and
+latency) is appended as one compact JSON line, written on a background thread. The replay provider
+(LLM_PROVIDER=replay) serves those recordings in place of a real client, sleeping the
+recorded (optionally scaled) latency, so production traffic shapes can be reproduced
+without provider calls.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+from log_pipeline import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+# Request parameters that identify a completion (model excluded, so recordings replay under any model)
+KEY_PARAMS = ("messages", "max_tokens", "temperature", "response_format")
+
+
+def request_key(request_params: Dict[str, Any]) -> str:
+    """Stable hash of the request parameters that determine the completion"""
+    canonical = json.dumps(
+        {name: request_params.get(name) for name in KEY_PARAMS},
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def prompt_key(request_params: Dict[str, Any]) -> str:
+    """Hash of the user prompt alone - still matches when system messages (rules) change"""
+    user_messages = [m.get("content", "") for m in request_params.get("messages", []) if m.get("role") == "user"]
+    return hashlib.sha256("\n".join(user_messages).encode("utf-8")).hexdigest()[:32]
+
+
+class LLMRecorder:
+    """
+    Appends completed LLM calls to LLM_RECORD_FILE (JSON lines).
+    Prompts are stored only with LLM_RECORD_PROMPTS=true, since they contain survey notes;
+    the request hashes are always stored so recordings can be replayed either way.
+    Lines are written by a background thread; when LLM_RECORD_QUEUE_SIZE lines are
+    pending, further calls are dropped from the capture and counted.
+    """
+
+    def __init__(self):
+        self.path = os.getenv("LLM_RECORD_FILE", "")
+        self.enabled = bool(self.path)
+        self.record_prompts = os.getenv("LLM_RECORD_PROMPTS", "false").lower() == "true"
+        self._writer = BackgroundWriter(
+            "llm-recorder",
+            self._append,
+            int(os.getenv("LLM_RECORD_QUEUE_SIZE", "1000"))
+        )
+
+        if self.enabled:
+            logger.info("LLM traffic capture enabled", extra={
+                "path": self.path,
+                "record_prompts": self.record_prompts
+            })
+
+    def record(self, request_params: Dict[str, Any], response: Any, latency: float, provider: str):
+        """
+        Append one completed call.
+
+        Args:
+            request_params: Parameters passed to chat.completions.create
+            response: Provider response object
+            latency: Seconds the API call took (excluding scheduler queueing)
+            provider: Provider that served the call
+        """
+        if not self.enabled:
+            return
+
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)
+        choice = response.choices[0]
+
+        entry = {
+            "ts": round(time.time(), 3),
+            "key": request_key(request_params),
+            "prompt_key": prompt_key(request_params),
+            "provider": provider,
+            "model": request_params.get("model"),
+            "params": {
+                name: request_params[name]
+                for name in ("max_tokens", "temperature", "response_format")
+                if name in request_params
+            },
+            "latency": round(latency, 4),
+            "response": {
+                "content": choice.message.content,
+                "finish_reason": getattr(choice, "finish_reason", None)
+            },
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+                "cached_tokens": cached_tokens or 0
+            }
+        }
+        if self.record_prompts:
+            entry["messages"] = request_params.get("messages", [])
+
+        self._writer.submit(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def _append(self, line: str):
+        # One write per line in append mode keeps other processes' lines intact
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def stop(self):
+        """Write pending lines"""
+        self._writer.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        writer = self._writer.get_stats()
+        return {
+            "enabled": self.enabled,
+            "path": self.path or None,
+            "recorded": writer["written"],
+            "pending": writer["queue_depth"],
+            "dropped": writer["dropped"],
+            "failed": writer["failed"]
+        }
+
+
+class ReplayMissError(Exception):
+    """No recording matches the request (LLM_REPLAY_ON_MISS=error)"""
+
+
+class _ReplayCompletions:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+
+    async def create(self, **request_params: Any) -> SimpleNamespace:
+        return await self._client.complete(request_params)
+
+
+class ReplayClient:
+    """
+    Serves recorded completions through the chat.completions.create interface.
+
+    Lookup is deterministic: exact request match, then user prompt match (rules or
+    system message changed), then - with LLM_REPLAY_ON_MISS=fallback - a recording
+    chosen by request hash. Repeated identical requests cycle through their recordings
+    in recorded order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.latency_scale = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+        self.on_miss = os.getenv("LLM_REPLAY_ON_MISS", "fallback")
+        self.chat = SimpleNamespace(completions=_ReplayCompletions(self))
+
+        self._recordings: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[int]] = {}
+        self._by_prompt: Dict[str, List[int]] = {}
+        self._served: Dict[str, int] = {}
+        self.matches = {"exact": 0, "prompt": 0, "fallback": 0, "miss": 0}
+        self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line of a capture that is still being written
+                index = len(self._recordings)
+                self._recordings.append(entry)
+                self._by_key.setdefault(entry["key"], []).append(index)
+                self._by_prompt.setdefault(entry.get("prompt_key", ""), []).append(index)
+
+        if not self._recordings:
+            raise ValueError(f"No LLM recordings found in {self.path}")
+        self.model = self._recordings[0].get("model") or "replay"
+        logger.info(f"Loaded {len(self._recordings)} LLM recordings for replay", extra={
+            "path": self.path,
+            "latency_scale": self.latency_scale
+        })
+
+    def _next(self, group: str, candidates: List[int]) -> Dict[str, Any]:
+        served = self._served.get(group, 0)
+        self._served[group] = served + 1
+        return self._recordings[candidates[served % len(candidates)]]
+
+    def _lookup(self, request_params: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(request_params)
+        if key in self._by_key:
+            self.matches["exact"] += 1
+            return self._next(key, self._by_key[key])
+
+        user_key = prompt_key(request_params)
+        if user_key in self._by_prompt:
+            self.matches["prompt"] += 1
+            return self._next(f"prompt:{user_key}", self._by_prompt[user_key])
+
+        if self.on_miss != "fallback":
+            self.matches["miss"] += 1
+            raise ReplayMissError(f"No recording matches request {key}")
+        self.matches["fallback"] += 1
+        return self._recordings[int(key, 16) % len(self._recordings)]
+
+    async def complete(self, request_params: Dict[str, Any]) -> SimpleNamespace:
+        entry = self._lookup(request_params)
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry["latency"] * self.latency_scale)
+
+        usage = entry.get("usage", {})
+        return SimpleNamespace(
+            model=entry.get("model"),
+            choices=[SimpleNamespace(
+                index=0,
+                message=SimpleNamespace(role="assistant", content=entry["response"]["content"]),
+                finish_reason=entry["response"].get("finish_reason")
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                total_tokens=usage.get("total_tokens", 0),
+                prompt_tokens_details={"cached_tokens": usage.get("cached_tokens", 0)}
+            )
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "recordings": len(self._recordings),
+            "latency_scale": self.latency_scale,
+            "on_miss": self.on_miss,
+            "matches": dict(self.matches)
+        }
+
+
+# Global LLM recorder instance
+llm_recorder = LLMRecorder()
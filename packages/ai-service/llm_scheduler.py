@@ -0,0 +1,314 @@
+"""
+LLM Scheduler - Priority and fair-share scheduling of LLM calls across requests.
+Calls are dispatched by weighted fair queuing over (priority class, flow) instead of
+arrival order, so an interactive edit does not queue behind a bulk re-generation.
+Dispatch respects the provider's concurrency and request/token rate limits.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+DEFAULT_PRIORITY = "standard"
+DEFAULT_FLOW = "default"
+
+# Priority class and flow (tenant/proposal) of the LLM calls made by the current task
+_call_context: ContextVar[Tuple[str, str]] = ContextVar(
+    "llm_call_context", default=(DEFAULT_PRIORITY, DEFAULT_FLOW)
+)
+
+
+def current_call_context() -> Tuple[str, str]:
+    """(priority class, flow) of LLM calls made by the current task"""
+    return _call_context.get()
+
+
+class QueueTimeout(Exception):
+    """No dispatch slot was granted within the queue timeout (the provider was never called)"""
+
+
+class _Waiter:
+    """A call waiting for a dispatch slot"""
+
+    __slots__ = ("start_tag", "seq", "priority", "cost", "future", "queued_at")
+
+    def __init__(self, start_tag: float, seq: int, priority: str, cost: float, future: asyncio.Future):
+        self.start_tag = start_tag
+        self.seq = seq
+        self.priority = priority
+        self.cost = cost
+        self.future = future
+        self.queued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.start_tag, self.seq) < (other.start_tag, other.seq)
+
+
+class LLMScheduler:
+    """
+    Start-time fair queuing of LLM calls.
+
+    - Each (priority class, flow) pair is a queue; a call's cost is its estimated tokens,
+      divided by the class weight, so flows share capacity in proportion to weight
+      and a flow submitting huge prompts does not crowd out others
+    - LLM_INTERACTIVE_RESERVED slots of LLM_MAX_CONCURRENT_CALLS are only used by
+      interactive calls, so interactive latency holds when bulk work saturates the rest
+    - Requests-per-minute and tokens-per-minute buckets mirror the provider's limits;
+      a provider rate-limit response pauses dispatch for its Retry-After
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+        self.max_concurrent = int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "8"))
+        self.interactive_reserved = min(
+            int(os.getenv("LLM_INTERACTIVE_RESERVED", "2")),
+            self.max_concurrent - 1
+        )
+        self.requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))  # 0 = unlimited
+        self.tokens_per_minute = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # 0 = unlimited
+        # Longest wait for a slot; request deadlines bound it further (0 = no limit)
+        self.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "0"))
+        self.weights = {
+            "interactive": float(os.getenv("LLM_WEIGHT_INTERACTIVE", "8")),
+            "standard": float(os.getenv("LLM_WEIGHT_STANDARD", "4")),
+            "bulk": float(os.getenv("LLM_WEIGHT_BULK", "1"))
+        }
+
+        self.active = 0
+        self._queues: Dict[str, List[_Waiter]] = {priority: [] for priority in PRIORITY_CLASSES}
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[Tuple[str, str], float] = {}
+
+        # Rate limit buckets (start full)
+        self._request_bucket = self.requests_per_minute
+        self._token_bucket = self.tokens_per_minute
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.dispatched = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.total_wait = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self.max_wait = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self.rate_limit_pauses = 0
+        self.queue_timeouts = 0
+
+        logger.info("LLM Scheduler initialized", extra={
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "interactive_reserved": self.interactive_reserved,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "queue_timeout": self.queue_timeout
+        })
+
+    @contextmanager
+    def context(self, priority: str, flow_id: Optional[str] = None):
+        """
+        Set the priority class and flow for LLM calls made inside the block
+        (including tasks it creates).
+        """
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority}")
+        token = _call_context.set((priority, flow_id or DEFAULT_FLOW))
+        try:
+            yield
+        finally:
+            _call_context.reset(token)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_bucket = min(
+                self.requests_per_minute,
+                self._request_bucket + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._token_bucket = min(
+                self.tokens_per_minute,
+                self._token_bucket + elapsed * self.tokens_per_minute / 60
+            )
+
+    def _rate_limit_delay(self, cost: float) -> float:
+        """Seconds until the buckets allow a call of this cost (0 if allowed now)"""
+        delay = 0.0
+        if self.requests_per_minute and self._request_bucket < 1:
+            delay = (1 - self._request_bucket) * 60 / self.requests_per_minute
+        if self.tokens_per_minute:
+            needed = min(cost, self.tokens_per_minute)
+            if self._token_bucket < needed:
+                delay = max(delay, (needed - self._token_bucket) * 60 / self.tokens_per_minute)
+        return delay
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Waiter with the smallest start tag among the classes allowed a slot now"""
+        best = None
+        for priority, queue in self._queues.items():
+            while queue and queue[0].future.done():
+                heapq.heappop(queue)  # Cancelled while waiting
+            if not queue:
+                continue
+            if priority != "interactive" and self.active >= self.max_concurrent - self.interactive_reserved:
+                continue
+            if best is None or queue[0] < best:
+                best = queue[0]
+        return best
+
+    def _schedule_dispatch(self, delay: float):
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and not self._timer.cancelled() and self._timer.when() <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._dispatch)
+
+    def _dispatch(self):
+        """Grant free slots to waiters in fair-queuing order"""
+        self._timer = None
+        self._refill()
+
+        paused_for = self._paused_until - time.monotonic()
+        if paused_for > 0:
+            if any(self._queues.values()):
+                self._schedule_dispatch(paused_for)
+            return
+
+        while self.active < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+
+            delay = self._rate_limit_delay(waiter.cost)
+            if delay > 0:
+                self._schedule_dispatch(delay)
+                break
+
+            heapq.heappop(self._queues[waiter.priority])
+            if self.requests_per_minute:
+                self._request_bucket -= 1
+            if self.tokens_per_minute:
+                self._token_bucket -= waiter.cost
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self.active += 1
+
+            wait = time.monotonic() - waiter.queued_at
+            self.dispatched[waiter.priority] += 1
+            self.total_wait[waiter.priority] += wait
+            self.max_wait[waiter.priority] = max(self.max_wait[waiter.priority], wait)
+            waiter.future.set_result(wait)
+
+        if len(self._flow_finish) > 1000:
+            # Flows whose finish tag is behind the virtual clock are equivalent to new flows
+            self._flow_finish = {
+                flow: finish for flow, finish in self._flow_finish.items() if finish > self._virtual_time
+            }
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        estimated_tokens: int,
+        priority: Optional[str] = None,
+        flow_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        """
+        Hold a dispatch slot for one LLM API call.
+
+        Args:
+            estimated_tokens: Estimated prompt + completion tokens (fair-share cost)
+            priority: Priority class (defaults to the current context)
+            flow_id: Tenant/proposal flow (defaults to the current context)
+            timeout: Maximum seconds to wait for the slot (e.g. the request deadline);
+                LLM_QUEUE_TIMEOUT applies when it is shorter
+
+        Yields:
+            Seconds spent waiting for the slot
+
+        Raises:
+            QueueTimeout: If no slot was granted within the timeout
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+
+        context_priority, context_flow = _call_context.get()
+        priority = priority if priority in self.weights else context_priority
+        flow = (priority, flow_id or context_flow)
+        cost = max(1, estimated_tokens)
+
+        start_tag = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        self._flow_finish[flow] = start_tag + cost / self.weights[priority]
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[priority], _Waiter(start_tag, next(self._seq), priority, cost, future))
+        self._dispatch()
+
+        if self.queue_timeout:
+            timeout = min(timeout, self.queue_timeout) if timeout is not None else self.queue_timeout
+
+        try:
+            wait = await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller was cancelled - give the slot back
+                self._release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.queue_timeouts += 1
+            raise QueueTimeout(f"No LLM dispatch slot within {timeout:.1f}s") from None
+
+        try:
+            yield wait
+        finally:
+            self._release()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket with the actual token count of a call"""
+        if self.tokens_per_minute and actual_tokens:
+            self._token_bucket -= actual_tokens - max(1, estimated_tokens)
+
+    def pause(self, seconds: float):
+        """Stop dispatching for a while (provider returned a rate-limit error)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.rate_limit_pauses += 1
+        logger.warning(f"Provider rate limit hit - pausing LLM dispatch for {seconds:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Scheduler metrics (queue depth and waits per priority class)"""
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "queue_depth": {
+                priority: sum(1 for waiter in queue if not waiter.future.done())
+                for priority, queue in self._queues.items()
+            },
+            "dispatched": dict(self.dispatched),
+            "avg_wait": {
+                priority: round(self.total_wait[priority] / count, 3) if count else 0.0
+                for priority, count in self.dispatched.items()
+            },
+            "max_wait": {priority: round(wait, 3) for priority, wait in self.max_wait.items()},
+            "rate_limit_pauses": self.rate_limit_pauses,
+            "queue_timeouts": self.queue_timeouts
+        }
+
+
+# Global LLM scheduler instance
+llm_scheduler = LLMScheduler()
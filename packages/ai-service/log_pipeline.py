@@ -0,0 +1,190 @@
+"""
+Log Pipeline - Non-blocking structured logging through a bounded queue.
+Log calls on the event loop only enqueue the record; JSON formatting and stdout
+writes happen on a listener thread. When the buffer is full, records are dropped
+and counted instead of stalling request handling. Debug records are sampled.
+BackgroundWriter applies the same pattern to other append-only output (trace
+batches, LLM traffic captures).
+"""
+
+import os
+import queue
+import random
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG records (per-attempt chatter); other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        if random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that counts and drops records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped: Dict[str, int] = {}
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class BackgroundWriter:
+    """
+    Runs a blocking write function (file append, exporter call) on a daemon thread.
+    submit() only enqueues; when the bounded queue is full the item is dropped and
+    counted. The thread starts on first use; stop() writes what is queued.
+    """
+
+    _STOP = object()
+
+    def __init__(self, name: str, write: Callable[[Any], None], queue_size: int = 1000):
+        self.name = name
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+        # Metrics
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, item: Any) -> bool:
+        """Queue an item for writing; False if it was dropped"""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            try:
+                self._write(item)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"{self.name} write failed: {str(e)}")
+
+    def stop(self):
+        """Write queued items and stop the thread (restarts on the next submit)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+
+class LogPipeline:
+    """
+    Routes a logger's records through a bounded queue to the real handler.
+    Falls back to attaching the handler directly when LOG_QUEUE_ENABLED=false.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+        self.queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        self.debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+        self.queue_handler: Optional[DroppingQueueHandler] = None
+        self.listener: Optional[DrainingQueueListener] = None
+        self.sampling_filter = SamplingFilter(self.debug_sample_rate)
+
+    def install(self, logger: logging.Logger, handler: logging.Handler):
+        """
+        Attach handler to logger behind the queue and start the listener thread.
+
+        Args:
+            logger: Logger to route (usually the root logger)
+            handler: Handler doing the actual formatting and writing
+        """
+        if not self.enabled:
+            handler.addFilter(self.sampling_filter)
+            logger.addHandler(handler)
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self.queue_handler = DroppingQueueHandler(log_queue)
+        self.queue_handler.addFilter(self.sampling_filter)
+        logger.addHandler(self.queue_handler)
+
+        # respect_handler_level: the target handler's own level still applies
+        self.listener = DrainingQueueListener(log_queue, handler, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, dropped and sampled-out record counts"""
+        dropped = self.queue_handler.dropped if self.queue_handler else {}
+        return {
+            "queued": self.enabled,
+            "queue_depth": self.queue_handler.queue.qsize() if self.queue_handler else 0,
+            "queue_size": self.queue_size,
+            "dropped": dict(dropped),
+            "dropped_total": sum(dropped.values()),
+            "debug_sampled_out": self.sampling_filter.sampled_out
+        }
+
+
+# Global log pipeline instance
+log_pipeline = LogPipeline()
@@ -4,9 +4,10 @@ Schema-driven, rule-enforced proposal generation from real user survey notes.
 Admins define schemas with sections and rules that MUST be followed.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import Response
+from contextlib import asynccontextmanager, contextmanager
 import logging
 from pythonjsonlogger import jsonlogger
 import os
@@ -16,16 +17,41 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Literal
 import time
 import uuid
+import asyncio
 
 # Import our modules AFTER loading env vars
 from llm_adapter import llm_adapter
-from schema_manager import schema_manager, ProposalSchema, SectionSchema
+from llm_recording import llm_recorder
+from schema_manager import schema_manager
 from rule_engine import rule_engine
-
-# Configure structured JSON logging
+from serialization import FastJSONResponse, FAST_JSON_RESPONSES
+from token_budget import token_budget_planner
+from prompt_templates import prompt_template_cache, STRUCTURED_OUTPUT
+from prompt_engineering import prompt_engineer
+from confidence import confidence_scorer
+from request_coalescer import request_coalescer
+from job_manager import job_manager, JobQueueFullError
+from admission_control import admission_controller, AdmissionRejected
+from llm_scheduler import llm_scheduler, QueueTimeout
+from metrics import (
+    metrics_registry, metric_labels, METRICS_ENABLED, STAGE_DURATION, DRAFT_DURATION
+)
+from tracing import tracer
+from deadlines import (
+    Deadline, DeadlineExceeded, deadline_scope, current_deadline,
+    section_time_estimator, DRAFT_DEADLINE_SECONDS
+)
+from notes_condenser import notes_condenser
+from survey_index import SurveyNotesIndex, section_query, RETRIEVAL_ENABLED, RETRIEVAL_MIN_TOKENS
+from log_pipeline import log_pipeline
+from usage_ledger import usage_ledger, usage_tags
+from cost_budget import cost_budget, BudgetExceeded
+
+# Configure structured JSON logging for all service modules. Records are queued and
+# formatted/written on a background thread, so logging never blocks the event loop.
 logger = logging.getLogger(__name__)
 logHandler = logging.StreamHandler()
 formatter = jsonlogger.JsonFormatter(
@@ -33,8 +59,18 @@ formatter = jsonlogger.JsonFormatter(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 logHandler.setFormatter(formatter)
-logger.addHandler(logHandler)
-logger.setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+log_pipeline.install(logging.getLogger(), logHandler)
+logging.getLogger().setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+# The provider SDKs log every HTTP request at INFO - LLMAdapter already logs each call
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Prompt layout: "section_first" (default) or "shared_prefix" - survey notes and global
+# rules form an identical prompt prefix across sections so provider prefix caching can hit
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "section_first")
+SHARED_PREFIX_LAYOUT = PROMPT_LAYOUT == "shared_prefix"
+
+# How often generate-draft checks whether the caller is still connected (seconds)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1.0"))
 
 
 # Request/Response Models
@@ -45,6 +81,15 @@ class DraftGenerationRequest(BaseModel):
     schema_id: str = Field(..., description="Schema ID defining sections and rules")
     attachments: Optional[List[str]] = Field(default=None, description="References to uploaded attachments")
     additional_guidance: Optional[str] = Field(default=None, description="Additional user guidance")
+    priority: Optional[Literal["interactive", "standard", "bulk"]] = Field(
+        default=None,
+        description="LLM scheduling class (default: standard for generate-draft, bulk for jobs)"
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time budget; sections that cannot finish in time are skipped (partial draft)"
+    )
 
 
 class DraftSection(BaseModel):
@@ -72,6 +117,8 @@ class DraftGenerationResponse(BaseModel):
     estimated_cost: float
     processing_time: float
     all_rules_passed: bool
+    partial: bool = False  # True when the deadline stopped generation early
+    sections_skipped: List[str] = Field(default_factory=list)
 
 
 class SchemaUploadRequest(BaseModel):
@@ -121,9 +168,21 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error fetching schemas from backend: {str(e)}")
         logger.info("Continuing with default schema only")
     
+    # Load the tokenizer off the event loop (may download its BPE file); counts use the
+    # character heuristic until it is ready
+    asyncio.get_running_loop().run_in_executor(None, token_budget_planner.load_encoding)
+    
+    # Start background workers for asynchronous draft jobs
+    await job_manager.start()
+    await usage_ledger.start()
+    
     yield
     
     # Shutdown
+    await job_manager.stop()
+    await usage_ledger.stop()
+    tracer.stop()
+    llm_recorder.stop()
     logger.info("AI Service shutting down")
 
 
@@ -182,7 +241,14 @@ async def root():
 
 
 @app.post("/api/ai/generate-draft", response_model=DraftGenerationResponse)
-async def generate_draft(request: DraftGenerationRequest):
+async def generate_draft(
+    request: DraftGenerationRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(default=None),
+    x_client_id: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+    x_tenant_id: Optional[str] = Header(default=None)
+):
     """
     Generate proposal draft using schema-defined sections and enforced rules.
     
@@ -192,12 +258,168 @@ async def generate_draft(request: DraftGenerationRequest):
     3. ENFORCE rules on generated content
     4. Return draft with rule enforcement results
     
+    Identical concurrent requests share one generation; retries sending the same
+    Idempotency-Key header receive the stored result. Generations are subject to
+    admission control: 429/503 with Retry-After when over the concurrency limits.
+    The per-client limit applies to requests identified by X-Client-ID (or X-Tenant-ID).
+    
+    The time budget comes from the X-Request-Timeout header (seconds), the
+    deadline_seconds field or DRAFT_DEADLINE_SECONDS. Sections that cannot finish
+    within it are skipped and the draft is returned with partial=true (504 if none
+    finished). Partial drafts are not stored for Idempotency-Key replays.
+    
+    LLM calls are checked against the draft, proposal and tenant daily budgets
+    (COST_BUDGET_*). Sections that would exceed a budget are skipped the same way;
+    if not even the first section fits, the request fails with 402.
+    
     Args:
         request: Draft generation request with REAL survey notes and schema ID
+        http_request: Raw request (disconnect detection)
+        idempotency_key: Optional Idempotency-Key header for safe retries
+        x_client_id: Optional X-Client-ID header identifying the calling client (per-client limit)
+        x_request_timeout: Optional X-Request-Timeout header (seconds the caller will wait)
+        x_tenant_id: Optional X-Tenant-ID header (usage attribution, tenant daily budget and
+            per-client limit when X-Client-ID is absent)
     
     Returns:
         Generated draft with rule enforcement results
     """
+    # Per-client admission limits need an explicit identity - callers behind one gateway
+    # (e.g. the backend) share an address, so the address alone would cap them all together
+    client_id = x_client_id or x_tenant_id
+    # Deadline starts now, so admission queueing counts against the budget
+    deadline_seconds = x_request_timeout or request.deadline_seconds or DRAFT_DEADLINE_SECONDS
+    deadline = Deadline(deadline_seconds) if deadline_seconds and deadline_seconds > 0 else None
+    # Only requests that would produce the same draft share work: the time budget, priority
+    # and tenant (budgets, attribution) shape the result as much as the content does
+    request_key = request_coalescer.request_key(
+        request.proposal_id,
+        request.survey_notes,
+        request.schema_id,
+        request.additional_guidance,
+        deadline.seconds if deadline else None,
+        request.priority,
+        x_tenant_id
+    )
+    try:
+        # Admission is taken inside the shared work: coalesced callers and
+        # idempotent replays do not occupy extra slots
+        response = await _cancel_on_disconnect(
+            http_request,
+            request_coalescer.run(
+                request_key,
+                lambda: _admitted_generate_draft(request, client_id, deadline, x_tenant_id),
+                idempotency_key=idempotency_key,
+                # A partial draft reflects this attempt's deadline/budget - a retry should try again
+                should_store=lambda draft: not draft.partial
+            )
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    # Fast path: serialize directly instead of re-validating via response_model
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(response.model_dump())
+    
+    return response
+
+
+async def _cancel_on_disconnect(http_request: Request, work: Awaitable[Any]) -> Any:
+    """
+    Await work, cancelling it if the client disconnects first.
+    Cancelling a coalesced waiter only stops the shared generation when no other caller waits for it.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.warning("Client disconnected - cancelling draft generation", extra={
+                    "path": http_request.url.path
+                })
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                # Nobody reads this response; 499 marks it in access logs
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async def _admitted_generate_draft(
+    request: DraftGenerationRequest,
+    client_id: Optional[str],
+    deadline: Optional[Deadline],
+    tenant_id: Optional[str] = None
+) -> DraftGenerationResponse:
+    """Run the pipeline while holding an admission slot"""
+    async with admission_controller.admit(client_id):
+        # LLM calls are fair-queued per proposal within the priority class
+        with llm_scheduler.context(request.priority or "standard", request.proposal_id), deadline_scope(deadline):
+            return await _generate_draft(request, tenant_id=tenant_id)
+
+
+async def _run_draft_job(request: DraftGenerationRequest, job, tenant_id: Optional[str] = None) -> DraftGenerationResponse:
+    """Run the pipeline for a background job (bulk priority unless requested otherwise)"""
+    # A job's deadline_seconds budget starts when a worker picks it up
+    deadline = Deadline(request.deadline_seconds) if request.deadline_seconds else None
+    with llm_scheduler.context(request.priority or "bulk", request.proposal_id), deadline_scope(deadline):
+        return await _generate_draft(request, on_section=job.add_section, tenant_id=tenant_id)
+
+
+async def _generate_draft(
+    request: DraftGenerationRequest,
+    on_section: Optional[Callable[[DraftSection], None]] = None,
+    tenant_id: Optional[str] = None
+) -> DraftGenerationResponse:
+    """
+    Run the draft generation pipeline (see generate_draft).
+    
+    Args:
+        request: Draft generation request
+        on_section: Called with each section as soon as it is generated (job progress)
+        tenant_id: Tenant the draft is generated for (usage attribution and tenant budget)
+    
+    Returns:
+        Generated draft
+    """
+    with tracer.span(
+        "generate_draft",
+        proposal_id=request.proposal_id,
+        schema_id=request.schema_id,
+        survey_notes_length=len(request.survey_notes)
+    ) as span, usage_tags(proposal_id=request.proposal_id, tenant_id=tenant_id), cost_budget.draft_scope():
+        response = await _run_draft_pipeline(request, on_section)
+        span.set_attributes(
+            sections=len(response.sections),
+            token_usage=response.token_usage,
+            rules_enforced=response.rules_enforced,
+            all_rules_passed=response.all_rules_passed,
+            partial=response.partial
+        )
+        return response
+
+
+@contextmanager
+def _pipeline_stage(stage: str, labels: Dict[str, str]):
+    """Trace a pipeline stage and record its duration in the stage histogram"""
+    started = time.perf_counter()
+    with tracer.span(stage, section=labels.get("section")) as span:
+        yield span
+    STAGE_DURATION.observe(time.perf_counter() - started, stage=stage, **labels)
+
+
+async def _run_draft_pipeline(
+    request: DraftGenerationRequest,
+    on_section: Optional[Callable[[DraftSection], None]]
+) -> DraftGenerationResponse:
+    """Draft generation pipeline body (see _generate_draft)"""
     start_time = time.time()
     
     logger.info("Received schema-based draft generation request", extra={
@@ -217,7 +439,9 @@ async def generate_draft(request: DraftGenerationRequest):
             )
         
         # Load schema
-        schema = schema_manager.get_schema(request.schema_id)
+        with tracer.span("schema_lookup", schema_id=request.schema_id) as span:
+            schema = schema_manager.get_schema(request.schema_id)
+            span.set_attribute("found", schema is not None)
         if not schema:
             raise HTTPException(
                 status_code=404,
@@ -235,84 +459,243 @@ async def generate_draft(request: DraftGenerationRequest):
         total_cost = 0.0
         total_rules_enforced = 0
         all_rules_passed = True
+        sections_skipped = []
+        stop_reason = None
+        deadline = current_deadline()
         
         # Sort sections by order
         sorted_sections = sorted(schema.sections, key=lambda s: s.order)
         
-        for section_schema in sorted_sections:
-            logger.info(f"Generating section: {section_schema.display_name}", extra={
-                "section": section_schema.name,
-                "required": section_schema.required,
-                "rules": len(section_schema.rules)
-            })
-            
-            # Create prompt for this section
-            system_msg = _create_system_message(section_schema, schema.global_rules)
-            user_prompt = _create_user_prompt(
-                request.survey_notes,
-                section_schema,
-                request.additional_guidance
+        # Deduplicate notes once - every section prompt reuses them
+        prompt_notes = token_budget_planner.dedupe_notes(request.survey_notes)
+        
+        # Index notes once; long notes are narrowed to the chunks relevant to each section
+        notes_index = SurveyNotesIndex(prompt_notes)
+        use_retrieval = RETRIEVAL_ENABLED and token_budget_planner.count_tokens(prompt_notes) > RETRIEVAL_MIN_TOKENS
+        
+        # Condense very long notes once (map-reduce, cached by content hash)
+        with metric_labels(schema=schema.id, section="notes_condensing"), tracer.span("notes_condensing") as span:
+            condense_result = await notes_condenser.condense(prompt_notes)
+            span.set_attributes(condensed=condense_result["condensed"], tokens_used=condense_result["tokens_used"])
+        total_tokens += condense_result["tokens_used"]
+        total_cost += condense_result["estimated_cost"]
+        if condense_result["condensed"]:
+            # Condensed notes are shared by all sections; the index still serves source references
+            prompt_notes = condense_result["notes"]
+            use_retrieval = False
+        
+        # Section prompts are compiled once per schema version
+        compiled_prompts = prompt_template_cache.get(schema)
+        
+        if SHARED_PREFIX_LAYOUT:
+            # One shared system message for all sections - notes are fitted once and not
+            # narrowed per section, otherwise the prefix would differ between calls
+            reserved_tokens = token_budget_planner.count_tokens(
+                compiled_prompts.render_shared_system_message("", request.additional_guidance)
+            ) + max(
+                (token_budget_planner.count_tokens(c.section_prompt) for c in compiled_prompts.sections.values()),
+                default=0
             )
-            
-            # Make REAL LLM API call
-            llm_response = await llm_adapter.generate_completion(
-                prompt=user_prompt,
-                system_message=system_msg
+            shared_notes, budget_plan = token_budget_planner.fit_notes(
+                prompt_notes,
+                reserved_tokens=reserved_tokens,
+                completion_tokens=llm_adapter.max_tokens
             )
-            
-            # Parse LLM response
-            content = llm_response["content"]
-            
-            # ENFORCE RULES on generated content
-            section_rules = schema_manager.get_section_rules(schema.id, section_schema.name)
-            enforcement_result = rule_engine.enforce_rules(
-                content=content,
-                rules=section_rules,
-                section_name=section_schema.name,
-                survey_notes=request.survey_notes
+            shared_system_msg = compiled_prompts.render_shared_system_message(
+                shared_notes,
+                request.additional_guidance
             )
+            use_retrieval = False
+        
+        for index, section_schema in enumerate(sorted_sections):
+            # Stop when the remaining budget cannot cover another section
+            if deadline and deadline.remaining() < section_time_estimator.estimate():
+                sections_skipped = [s.name for s in sorted_sections[index:]]
+                stop_reason = "deadline"
+                break
+            section_start = time.time()
+            section_labels = {
+                "provider": llm_adapter.provider.value,
+                "model": llm_adapter.model,
+                "schema": schema.id,
+                "section": section_schema.name
+            }
             
-            total_rules_enforced += len(section_rules)
-            
-            # Check if rules passed
-            if not enforcement_result.passed:
-                all_rules_passed = False
-                logger.warning(f"Section {section_schema.name} failed rule enforcement", extra={
-                    "violations": len(enforcement_result.violations),
-                    "strict_violations": enforcement_result.to_dict()["strict_violations"]
+            with tracer.span("section", section=section_schema.name, order=section_schema.order) as section_span:
+                logger.info(f"Generating section: {section_schema.display_name}", extra={
+                    "section": section_schema.name,
+                    "required": section_schema.required,
+                    "rules": len(section_schema.rules)
                 })
-            
-            # Apply transformations if any
-            content = rule_engine.apply_transformations(content, section_rules)
-            
-            # Track tokens and cost
-            total_tokens += llm_response["tokens_used"]
-            total_cost += llm_response["estimated_cost"]
-            
-            # Create section object
-            section = DraftSection(
-                type=section_schema.name,
-                content=content,
-                confidence_score=0.8,  # TODO: Calculate based on survey notes quality
-                rationale=f"Generated based on survey notes for {section_schema.display_name}",
-                source_references=[],  # TODO: Extract references from survey notes
-                missing_info=[],  # TODO: Identify missing information
-                order=section_schema.order,
-                rule_enforcement=enforcement_result.to_dict()
-            )
-            
-            generated_sections.append(section)
-            
-            logger.info(f"Section generated and rules enforced", extra={
-                "section": section_schema.name,
-                "rules_passed": enforcement_result.passed,
-                "tokens_used": llm_response["tokens_used"]
-            })
+                
+                # Create prompt for this section
+                with _pipeline_stage("prompt_build", section_labels) as stage_span:
+                    section_prompt = compiled_prompts.sections[section_schema.name]
+                    if SHARED_PREFIX_LAYOUT:
+                        system_msg = shared_system_msg
+                        user_prompt = section_prompt.section_prompt
+                    else:
+                        system_msg = section_prompt.system_message
+                        
+                        if use_retrieval:
+                            section_source_notes = notes_index.select(
+                                section_query(section_schema, request.additional_guidance)
+                            )
+                        else:
+                            section_source_notes = prompt_notes
+                        
+                        # Fit survey notes into the per-section token budget before sending
+                        reserved_tokens = token_budget_planner.count_tokens(system_msg) + token_budget_planner.count_tokens(
+                            section_prompt.render_user_prompt("", request.additional_guidance)
+                        )
+                        section_notes, budget_plan = token_budget_planner.fit_notes(
+                            section_source_notes,
+                            reserved_tokens=reserved_tokens,
+                            completion_tokens=llm_adapter.max_tokens
+                        )
+                        
+                        user_prompt = section_prompt.render_user_prompt(section_notes, request.additional_guidance)
+                    stage_span.set_attributes(
+                        prompt_tokens_estimate=budget_plan["reserved_tokens"] + budget_plan["fitted_tokens"],
+                        notes_trimmed=budget_plan["trimmed"],
+                        retrieval_used=use_retrieval
+                    )
+                
+                # Make REAL LLM API call
+                try:
+                    with metric_labels(schema=schema.id, section=section_schema.name):
+                        llm_response = await llm_adapter.generate_completion(
+                            prompt=user_prompt,
+                            system_message=system_msg,
+                            json_mode=STRUCTURED_OUTPUT,
+                            cache_namespace=f"{schema.id}:{schema.version}:{section_schema.name}"
+                        )
+                except DeadlineExceeded:
+                    section_span.add_event("deadline_exceeded")
+                    sections_skipped = [s.name for s in sorted_sections[index:]]
+                    stop_reason = "deadline"
+                    break
+                except BudgetExceeded as e:
+                    if not generated_sections:
+                        raise  # Nothing to return - rejected below with 402
+                    section_span.add_event("budget_exceeded", scope=e.scope, unit=e.unit)
+                    sections_skipped = [s.name for s in sorted_sections[index:]]
+                    stop_reason = f"{e.scope}_budget"
+                    break
+                
+                # Parse LLM response (structured JSON contract, tolerant of fences/truncation)
+                if STRUCTURED_OUTPUT:
+                    structured = prompt_engineer.parse_llm_response(llm_response["content"])
+                    content = structured["content"]
+                    confidence_score = structured["confidence"]
+                    rationale = structured["rationale"]
+                    source_references = structured["sources"]
+                    missing_info = structured["missing_info"]
+                else:
+                    content = llm_response["content"]
+                    confidence_score = 0.5
+                    rationale = f"Generated based on survey notes for {section_schema.display_name}"
+                    source_references = []
+                    missing_info = []
+                
+                # ENFORCE RULES on generated content
+                with _pipeline_stage("rule_enforcement", section_labels) as stage_span:
+                    section_rules = schema_manager.get_section_rules(schema.id, section_schema.name)
+                    enforcement_result = rule_engine.enforce_rules(
+                        content=content,
+                        rules=section_rules,
+                        section_name=section_schema.name,
+                        survey_notes=request.survey_notes
+                    )
+                    stage_span.set_attributes(
+                        rules=len(section_rules),
+                        passed=enforcement_result.passed,
+                        violations=len(enforcement_result.violations)
+                    )
+                
+                total_rules_enforced += len(section_rules)
+                
+                # Check if rules passed
+                if not enforcement_result.passed:
+                    all_rules_passed = False
+                    logger.warning(f"Section {section_schema.name} failed rule enforcement", extra={
+                        "violations": len(enforcement_result.violations),
+                        "strict_violations": enforcement_result.to_dict()["strict_violations"]
+                    })
+                
+                # Score confidence locally from notes support, rule results and missing info
+                # (scored before transformations, which add admin text not found in the notes)
+                if confidence_scorer.source == "local":
+                    with _pipeline_stage("confidence", section_labels):
+                        confidence = confidence_scorer.score(
+                            content=content,
+                            notes_index=notes_index,
+                            enforcement_result=enforcement_result,
+                            rules=section_rules,
+                            missing_info=missing_info
+                        )
+                        confidence_score = confidence["score"]
+                
+                # Apply transformations if any
+                with _pipeline_stage("transformations", section_labels):
+                    content = rule_engine.apply_transformations(content, section_rules)
+                
+                # Track tokens and cost
+                total_tokens += llm_response["tokens_used"]
+                total_cost += llm_response["estimated_cost"]
+                
+                # Create section object (built from trusted values - no re-validation)
+                section = DraftSection.model_construct(
+                    type=section_schema.name,
+                    content=content,
+                    confidence_score=confidence_score,
+                    rationale=rationale,
+                    source_references=source_references or notes_index.references(content),
+                    missing_info=missing_info,
+                    order=section_schema.order,
+                    rule_enforcement=enforcement_result.to_dict()
+                )
+                
+                generated_sections.append(section)
+                section_time_estimator.observe(time.time() - section_start)
+                if on_section:
+                    on_section(section)
+                
+                section_span.set_attributes(
+                    tokens_used=llm_response["tokens_used"],
+                    cached_tokens=llm_response["cached_tokens"],
+                    rules_passed=enforcement_result.passed,
+                    confidence_score=confidence_score
+                )
+                logger.info(f"Section generated and rules enforced", extra={
+                    "section": section_schema.name,
+                    "rules_passed": enforcement_result.passed,
+                    "tokens_used": llm_response["tokens_used"],
+                    "cached_tokens": llm_response["cached_tokens"],
+                    "prompt_tokens_estimate": budget_plan["reserved_tokens"] + budget_plan["fitted_tokens"],
+                    "notes_trimmed": budget_plan["trimmed"],
+                    "retrieval_used": use_retrieval,
+                    "confidence_score": confidence_score,
+                    "missing_info": len(missing_info)
+                })
+        
+        if stop_reason == "deadline" and not generated_sections:
+            raise DeadlineExceeded("Request deadline reached before any section was generated")
         
         processing_time = time.time() - start_time
+        DRAFT_DURATION.observe(processing_time, schema=schema.id, outcome="partial" if sections_skipped else "complete")
+        
+        if sections_skipped:
+            logger.warning(f"Draft stopped early ({stop_reason}) - returning partial draft", extra={
+                "proposal_id": request.proposal_id,
+                "reason": stop_reason,
+                "deadline_seconds": deadline.seconds if deadline else None,
+                "sections_generated": len(generated_sections),
+                "sections_skipped": sections_skipped
+            })
         
         # Create response
-        response = DraftGenerationResponse(
+        response = DraftGenerationResponse.model_construct(
             draft_id=str(uuid.uuid4()),
             proposal_id=request.proposal_id,
             schema_id=schema.id,
@@ -323,7 +706,9 @@ async def generate_draft(request: DraftGenerationRequest):
             token_usage=total_tokens,
             estimated_cost=round(total_cost, 4),
             processing_time=round(processing_time, 2),
-            all_rules_passed=all_rules_passed
+            all_rules_passed=all_rules_passed,
+            partial=bool(sections_skipped),
+            sections_skipped=sections_skipped
         )
         
         logger.info("Schema-based draft generation completed", extra={
@@ -339,7 +724,47 @@ async def generate_draft(request: DraftGenerationRequest):
         
     except HTTPException:
         raise
+    except BudgetExceeded as e:
+        DRAFT_DURATION.observe(time.time() - start_time, schema=request.schema_id, outcome="budget_exceeded")
+        logger.warning("Draft generation rejected by cost budget", extra={
+            "proposal_id": request.proposal_id,
+            "scope": e.scope,
+            "unit": e.unit,
+            "limit": e.limit,
+            "projected": e.projected
+        })
+        raise HTTPException(
+            status_code=402,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
+    except DeadlineExceeded as e:
+        DRAFT_DURATION.observe(time.time() - start_time, schema=request.schema_id, outcome="deadline_exceeded")
+        logger.warning("Draft generation timed out", extra={
+            "proposal_id": request.proposal_id,
+            "error": str(e)
+        })
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueueTimeout as e:
+        DRAFT_DURATION.observe(time.time() - start_time, schema=request.schema_id, outcome="queue_timeout")
+        logger.warning("Draft generation timed out waiting for LLM capacity", extra={
+            "proposal_id": request.proposal_id,
+            "error": str(e)
+        })
+        raise HTTPException(status_code=503, detail=f"LLM capacity exhausted: {str(e)}")
+    except asyncio.CancelledError:
+        # Caller disconnected or job cancelled - record the spend nobody will see
+        llm_adapter.record_abandoned(total_tokens, total_cost)
+        DRAFT_DURATION.observe(time.time() - start_time, schema=request.schema_id, outcome="abandoned")
+        logger.warning("Draft generation abandoned", extra={
+            "proposal_id": request.proposal_id,
+            "sections_generated": len(generated_sections),
+            "tokens_used": total_tokens,
+            "estimated_cost": round(total_cost, 4)
+        })
+        raise
     except Exception as e:
+        DRAFT_DURATION.observe(time.time() - start_time, schema=request.schema_id, outcome="error")
         logger.error("Draft generation failed", extra={
             "error": str(e),
             "proposal_id": request.proposal_id
@@ -350,60 +775,72 @@ async def generate_draft(request: DraftGenerationRequest):
         )
 
 
-def _create_system_message(section_schema: SectionSchema, global_rules: List) -> str:
-    """Create system message for LLM based on section schema"""
-    message = f"""You are generating the {section_schema.display_name} section of a business proposal.
-
-Section Description: {section_schema.description}
-
-CRITICAL: Your output will be ENFORCED against strict rules. You MUST:
-1. Base content ONLY on the actual survey notes provided
-2. Follow the required output format: {section_schema.output_format}
-3. Comply with all section rules
-
-"""
-    
-    # Add section rules
-    if section_schema.rules:
-        message += "\nSECTION RULES (STRICTLY ENFORCED):\n"
-        for rule in section_schema.rules:
-            message += f"- {rule.name}: {rule.description}\n"
+@app.post("/api/ai/jobs", status_code=202)
+async def create_draft_job(
+    request: DraftGenerationRequest,
+    x_tenant_id: Optional[str] = Header(default=None)
+):
+    """
+    Queue draft generation as a background job.
+    Poll GET /api/ai/jobs/{job_id} for status and sections as they complete.
     
-    # Add global rules
-    if global_rules:
-        message += "\nGLOBAL RULES (STRICTLY ENFORCED):\n"
-        for rule in global_rules:
-            message += f"- {rule.name}: {rule.description}\n"
+    Args:
+        request: Draft generation request with REAL survey notes and schema ID
+        x_tenant_id: Optional X-Tenant-ID header (usage attribution and tenant daily budget)
     
-    return message
-
-
-def _create_user_prompt(
-    survey_notes: str,
-    section_schema: SectionSchema,
-    additional_guidance: Optional[str]
-) -> str:
-    """Create user prompt for LLM"""
-    prompt = f"""Generate the {section_schema.display_name} section based on these REAL survey notes:
-
-SURVEY NOTES:
-{survey_notes}
-"""
+    Returns:
+        Job ID and status URL
+    """
+    if not request.survey_notes.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Survey notes cannot be empty - REAL user input required"
+        )
     
-    if additional_guidance:
-        prompt += f"\nADDITIONAL GUIDANCE:\n{additional_guidance}\n"
+    schema = schema_manager.get_schema(request.schema_id)
+    if not schema:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Schema {request.schema_id} not found"
+        )
     
-    if section_schema.template:
-        prompt += f"\nTEMPLATE:\n{section_schema.template}\n"
+    try:
+        job = job_manager.submit(
+            lambda job: _run_draft_job(request, job, x_tenant_id),
+            metadata={
+                "proposal_id": request.proposal_id,
+                "schema_id": schema.id,
+                "total_sections": len(schema.sections)
+            }
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
-    prompt += f"\nOutput Format: {section_schema.output_format}\n"
+    return {
+        "job_id": job.id,
+        "status": job.status.value,
+        "status_url": f"/api/ai/jobs/{job.id}"
+    }
+
+
+@app.get("/api/ai/jobs/{job_id}")
+async def get_draft_job(job_id: str):
+    """Get job status, sections generated so far and the final draft once completed"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    if section_schema.min_length:
-        prompt += f"Minimum Length: {section_schema.min_length} characters\n"
-    if section_schema.max_length:
-        prompt += f"Maximum Length: {section_schema.max_length} characters\n"
+    return FastJSONResponse(job.to_dict())
+
+
+@app.delete("/api/ai/jobs/{job_id}")
+async def cancel_draft_job(job_id: str):
+    """Cancel a queued or running job (outstanding LLM calls are cancelled)"""
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    return prompt
+    return {"job_id": job.id, "status": job.status.value}
 
 
 @app.post("/api/ai/schemas")
@@ -483,10 +920,72 @@ async def activate_schema(schema_id: str):
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics (per-stage latency histograms, retries, cache hits, queue depths)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics_registry.render(), media_type=metrics_registry.CONTENT_TYPE)
+
+
+# Queue depths are read at scrape time
+metrics_registry.gauge(
+    "ai_admission_queue_depth",
+    "Draft requests waiting for admission",
+    lambda: {(): admission_controller.get_stats()["queue_depth"]}
+)
+metrics_registry.gauge(
+    "ai_admission_active",
+    "Draft requests currently admitted",
+    lambda: {(): admission_controller.get_stats()["active"]}
+)
+metrics_registry.gauge(
+    "ai_llm_scheduler_queue_depth",
+    "LLM calls waiting for a scheduler slot",
+    lambda: {(priority,): depth for priority, depth in llm_scheduler.get_stats()["queue_depth"].items()},
+    ("priority",)
+)
+metrics_registry.gauge(
+    "ai_log_records_dropped",
+    "Log records dropped because the log queue was full",
+    lambda: {(level,): count for level, count in log_pipeline.get_stats()["dropped"].items()},
+    ("level",)
+)
+metrics_registry.gauge(
+    "ai_jobs_queue_depth",
+    "Draft jobs waiting for a worker",
+    lambda: {(): job_manager.get_stats()["queue_depth"]}
+)
+
+
 @app.get("/api/ai/usage-stats")
-async def get_usage_stats():
-    """Get LLM usage statistics"""
-    return llm_adapter.get_usage_stats()
+async def get_usage_stats(
+    window: Optional[float] = Query(default=None, gt=0, description="Ledger window in seconds (default: last day)"),
+    group_by: str = Query(default="schema_id,section", description="Comma-separated ledger grouping columns"),
+    limit: int = Query(default=50, ge=1, le=1000, description="Maximum ledger groups returned")
+):
+    """
+    Get LLM usage statistics.
+    
+    Process counters cover this worker since startup; the ledger section aggregates the
+    persistent usage ledger (all workers, survives restarts) over the requested window.
+    """
+    stats = llm_adapter.get_usage_stats()
+    stats["request_coalescing"] = request_coalescer.get_stats()
+    stats["jobs"] = job_manager.get_stats()
+    stats["admission"] = admission_controller.get_stats()
+    stats["logging"] = log_pipeline.get_stats()
+    stats["tracing"] = tracer.get_stats()
+    try:
+        stats["ledger"] = await usage_ledger.aggregate(
+            window=window,
+            group_by=[column.strip() for column in group_by.split(",") if column.strip()],
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stats["ledger"]["writer"] = usage_ledger.get_stats()
+    return stats
 
 
 if __name__ == "__main__":
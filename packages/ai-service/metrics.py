@@ -0,0 +1,265 @@
+"""
+Metrics - Prometheus metrics for the draft pipeline (text exposition format).
+Counters, histograms and scrape-time gauges are implemented on the standard library,
+so /metrics works without the prometheus_client package. Per-stage latency histograms
+are labeled by provider, model, schema and section.
+"""
+
+import os
+import bisect
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; spans sub-millisecond rule checks up to multi-retry LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Labels every LLM/stage metric carries
+PIPELINE_LABELS = ("provider", "model", "schema", "section")
+
+# Schema/section of the work done by the current task (read by the LLM adapter)
+_metric_labels: ContextVar[Dict[str, str]] = ContextVar("metric_labels", default={})
+
+
+@contextmanager
+def metric_labels(**labels: str):
+    """Attach labels (e.g. schema, section) to metrics recorded inside the block"""
+    token = _metric_labels.set({**_metric_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _metric_labels.reset(token)
+
+
+def current_metric_labels() -> Dict[str, str]:
+    """Labels set by the enclosing metric_labels blocks"""
+    return _metric_labels.get()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class: a named metric family with fixed label names"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        # Missing labels are exported empty rather than rejected - metrics must never break a request
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+
+class Gauge(_Metric):
+    """Current value(s) read from a callback at scrape time"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        label_names: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Holds metric families and renders the Prometheus text exposition format"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        label_names: Sequence[str] = ()
+    ) -> Gauge:
+        """Register a gauge whose values are read from callback() on every scrape"""
+        return self._register(Gauge(name, documentation, callback, label_names))
+
+    def unregister(self, name: str):
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text format"""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.error(f"Failed to collect metric {metric.name}: {str(e)}")
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry instance
+metrics_registry = MetricsRegistry()
+
+# Pipeline metrics
+LLM_REQUEST_DURATION = metrics_registry.histogram(
+    "ai_llm_request_duration_seconds",
+    "LLM API call latency per attempt (full response; completions are not streamed)",
+    PIPELINE_LABELS + ("outcome",)
+)
+LLM_QUEUE_WAIT = metrics_registry.histogram(
+    "ai_llm_queue_wait_seconds",
+    "Time an LLM call waited for a scheduler slot",
+    PIPELINE_LABELS + ("priority",)
+)
+LLM_RETRIES = metrics_registry.counter(
+    "ai_llm_retries_total",
+    "LLM call attempts that failed and were retried",
+    PIPELINE_LABELS + ("reason",)
+)
+LLM_CACHE_HITS = metrics_registry.counter(
+    "ai_llm_cache_hits_total",
+    "LLM calls served from the semantic completion cache",
+    PIPELINE_LABELS
+)
+LLM_TOKENS = metrics_registry.counter(
+    "ai_llm_tokens_total",
+    "Tokens reported by the provider (kind=prompt|completion|cached|total)",
+    PIPELINE_LABELS + ("kind",)
+)
+LLM_PROMPT_ESTIMATE_RATIO = metrics_registry.histogram(
+    "ai_llm_prompt_token_estimate_ratio",
+    "Provider-reported prompt tokens divided by the local tokenizer estimate",
+    ("provider", "model"),
+    buckets=(0.5, 0.75, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 1.5, 2.0)
+)
+STAGE_DURATION = metrics_registry.histogram(
+    "ai_pipeline_stage_duration_seconds",
+    "Duration of draft pipeline stages (prompt_build, rule_enforcement, transformations, confidence)",
+    PIPELINE_LABELS + ("stage",)
+)
+DRAFT_DURATION = metrics_registry.histogram(
+    "ai_draft_duration_seconds",
+    "End-to-end draft generation time",
+    ("schema", "outcome")
+)
+ADMISSION_QUEUE_WAIT = metrics_registry.histogram(
+    "ai_admission_queue_wait_seconds",
+    "Time a draft request waited in the admission queue"
+)
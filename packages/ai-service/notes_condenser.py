@@ -0,0 +1,240 @@
+"""
+Notes Condenser - Map-reduce summarization of very long survey notes.
+Long notes are split into chunks, condensed concurrently through the LLM adapter and
+cached by content hash, so every section prompt (and every regeneration) reuses them.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Any, List
+
+from llm_adapter import llm_adapter
+from llm_scheduler import QueueTimeout
+from deadlines import DeadlineExceeded
+from cost_budget import BudgetExceeded
+from token_budget import token_budget_planner
+
+logger = logging.getLogger(__name__)
+
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+# Retrying the next chunk cannot succeed after these - they end condensing (and the request)
+FATAL_ERRORS = (DeadlineExceeded, BudgetExceeded, QueueTimeout)
+
+# Completion allowance for tiny chunks (bullet formatting can outgrow a very short excerpt)
+MIN_CHUNK_SUMMARY_TOKENS = 256
+
+CONDENSE_SYSTEM_MESSAGE = """You condense survey notes for a business proposal writer.
+
+CRITICAL: Preserve every fact from the excerpt. You MUST:
+1. Keep all names, numbers, quantities, measurements, prices, dates and deadlines exactly
+2. Keep all requirements, constraints, preferences and open questions
+3. Remove repetition, filler and small talk
+4. Never add information that is not in the excerpt
+
+Output concise bullet points only."""
+
+
+class NotesCondenser:
+    """
+    Condenses survey notes beyond a configurable size with a one-time concurrent
+    map-reduce pass. Results are cached by content hash.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("NOTES_CONDENSE_ENABLED", "true").lower() == "true"
+        self.min_chars = int(os.getenv("NOTES_CONDENSE_MIN_CHARS", "20000"))
+        self.chunk_chars = int(os.getenv("NOTES_CONDENSE_CHUNK_CHARS", "6000"))
+        self.concurrency = int(os.getenv("NOTES_CONDENSE_CONCURRENCY", "4"))
+        self.max_rounds = max(1, int(os.getenv("NOTES_CONDENSE_MAX_ROUNDS", "2")))
+        self.cache_size = int(os.getenv("NOTES_CONDENSE_CACHE_SIZE", "128"))
+        self.temperature = 0.2
+
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        logger.info("Notes Condenser initialized", extra={
+            "enabled": self.enabled,
+            "min_chars": self.min_chars,
+            "chunk_chars": self.chunk_chars,
+            "concurrency": self.concurrency
+        })
+
+    def _cache_key(self, survey_notes: str) -> str:
+        """Content hash including everything that changes the condensed output"""
+        digest = hashlib.sha256()
+        digest.update(f"{llm_adapter.model}|{self.chunk_chars}|{self.max_rounds}|".encode("utf-8"))
+        digest.update(survey_notes.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _split_chunks(self, survey_notes: str) -> List[str]:
+        """Group paragraphs into chunks of at most chunk_chars (long paragraphs are cut)"""
+        chunks = []
+        current = []
+        current_length = 0
+
+        for paragraph in PARAGRAPH_SPLIT.split(survey_notes):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+
+            if current and current_length + len(paragraph) > self.chunk_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_length = 0
+
+            while len(paragraph) > self.chunk_chars:
+                chunks.append(paragraph[:self.chunk_chars])
+                paragraph = paragraph[self.chunk_chars:]
+
+            current.append(paragraph)
+            current_length += len(paragraph) + 2
+
+        if current:
+            chunks.append("\n\n".join(current))
+
+        return chunks
+
+    async def _condense_round(self, survey_notes: str) -> Dict[str, Any]:
+        """Map step: condense all chunks concurrently; reduce step: join in order"""
+        chunks = self._split_chunks(survey_notes)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def condense_chunk(index: int, chunk: str) -> Any:
+            async with semaphore:
+                try:
+                    # A summary as long as the excerpt itself is no longer condensing it
+                    return await llm_adapter.generate_completion(
+                        prompt=f"SURVEY NOTES EXCERPT ({index + 1}/{len(chunks)}):\n{chunk}",
+                        system_message=CONDENSE_SYSTEM_MESSAGE,
+                        max_tokens=max(MIN_CHUNK_SUMMARY_TOKENS, token_budget_planner.count_tokens(chunk)),
+                        temperature=self.temperature
+                    )
+                except FATAL_ERRORS:
+                    raise
+                except Exception as e:
+                    # Provider errors only cost this chunk
+                    return e
+
+        tasks = [asyncio.ensure_future(condense_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # Deadline, budget, capacity or caller gone - stop the remaining chunks too
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        parts = []
+        tokens_used = 0
+        estimated_cost = 0.0
+        failed = 0
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                # Keep the raw chunk - losing facts is worse than a longer prompt
+                logger.error(f"Failed to condense survey notes chunk: {str(result)}")
+                parts.append(chunk)
+                failed += 1
+                continue
+            tokens_used += result["tokens_used"]
+            estimated_cost += result["estimated_cost"]
+            if result.get("finish_reason") == "length":
+                # A cut-off summary silently drops the facts after the cut - keep the raw chunk
+                logger.warning("Condensed survey notes chunk was truncated - keeping the original chunk")
+                parts.append(chunk)
+                failed += 1
+                continue
+            parts.append(result["content"].strip())
+
+        return {
+            "notes": "\n\n".join(parts),
+            "chunks": len(chunks),
+            "failed_chunks": failed,
+            "tokens_used": tokens_used,
+            "estimated_cost": estimated_cost
+        }
+
+    async def condense(self, survey_notes: str) -> Dict[str, Any]:
+        """
+        Condense survey notes when they exceed the configured size.
+
+        Args:
+            survey_notes: Survey notes (ideally already deduplicated)
+
+        Returns:
+            Dict containing:
+                - notes: Condensed notes (or the original notes when not needed)
+                - condensed: Whether condensation was applied
+                - cached: Whether the result came from the cache
+                - tokens_used: Tokens spent condensing (0 on cache hit)
+                - estimated_cost: Cost of condensing
+        """
+        result = {
+            "notes": survey_notes,
+            "condensed": False,
+            "cached": False,
+            "tokens_used": 0,
+            "estimated_cost": 0.0
+        }
+
+        if not self.enabled or len(survey_notes) <= self.min_chars:
+            return result
+
+        key = self._cache_key(survey_notes)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            result.update({"notes": cached, "condensed": True, "cached": True})
+            logger.info("Using cached condensed survey notes", extra={
+                "original_length": len(survey_notes),
+                "condensed_length": len(cached)
+            })
+            return result
+        self.cache_misses += 1
+
+        start_time = asyncio.get_running_loop().time()
+        notes = survey_notes
+        failed_chunks = 0
+        rounds = 0
+        while rounds < self.max_rounds:
+            round_result = await self._condense_round(notes)
+            rounds += 1
+            notes = round_result["notes"]
+            failed_chunks += round_result["failed_chunks"]
+            result["tokens_used"] += round_result["tokens_used"]
+            result["estimated_cost"] += round_result["estimated_cost"]
+            if len(notes) <= self.min_chars:
+                break
+            if round_result["failed_chunks"] == round_result["chunks"]:
+                # Nothing condensed - another round would only repeat the failing calls
+                break
+
+        # Only cache complete results so failed chunks are retried next time
+        if not failed_chunks:
+            self._cache[key] = notes
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        result.update({"notes": notes, "condensed": True})
+
+        logger.info("Survey notes condensed", extra={
+            "original_length": len(survey_notes),
+            "condensed_length": len(notes),
+            "rounds": rounds,
+            "failed_chunks": failed_chunks,
+            "tokens_used": result["tokens_used"],
+            "elapsed_time": asyncio.get_running_loop().time() - start_time
+        })
+
+        return result
+
+
+# Global notes condenser instance
+notes_condenser = NotesCondenser()
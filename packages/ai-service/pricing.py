@@ -0,0 +1,131 @@
+"""
+Pricing - Per-model token prices for LLM cost estimates.
+Prices are loaded from a JSON price table (LLM_PRICE_TABLE, default model_prices.json)
+with separate rates for prompt, cached prompt and completion tokens, so costs follow
+the provider's billing instead of one flat per-token rate.
+"""
+
+import os
+import json
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_prices.json")
+
+
+class ModelPrice:
+    """USD per 1M tokens for one model"""
+
+    __slots__ = ("input", "cached_input", "output")
+
+    def __init__(self, input: float, output: float, cached_input: Optional[float] = None):
+        self.input = input
+        self.output = output
+        # Providers without prompt caching bill cached tokens (if reported) at the input rate
+        self.cached_input = input if cached_input is None else cached_input
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"input": self.input, "cached_input": self.cached_input, "output": self.output}
+
+
+class PriceTable:
+    """
+    Looks up model prices: exact model name first, then the longest configured
+    prefix (e.g. "gpt-4o" for "gpt-4o-2024-08-06"), then the table's "default" entry.
+    Aliases map names that are not model names (Azure deployments) to a priced model.
+    Models with no price are costed at 0 and reported in get_stats.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("LLM_PRICE_TABLE", DEFAULT_PRICE_TABLE)
+        self.prices: Dict[str, ModelPrice] = {}
+        self.default: Optional[ModelPrice] = None
+        self.unpriced_models: set = set()
+        self.aliases: Dict[str, str] = {}
+        self._resolved: Dict[str, Optional[ModelPrice]] = {}
+        self.load()
+
+    def load(self):
+        """(Re)load the price table file"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                table = json.load(f)
+            prices = {
+                model: ModelPrice(**values)
+                for model, values in table.get("models", {}).items()
+            }
+            default = ModelPrice(**table["default"]) if table.get("default") else None
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Failed to load price table {self.path}: {str(e)} - costs will be reported as 0")
+            return
+
+        self.prices = prices
+        self.default = default
+        self._resolved = {}
+        self.unpriced_models = set()
+        logger.info(f"Loaded prices for {len(prices)} models", extra={"path": self.path})
+
+    def alias(self, name: str, model: str):
+        """Price calls made under name (e.g. an Azure deployment) as model"""
+        self.aliases[name] = model
+        self._resolved.pop(name, None)
+        self.unpriced_models.discard(name)
+
+    def get(self, model: Optional[str]) -> Optional[ModelPrice]:
+        """Price entry for a model (None if the table has no match and no default)"""
+        name = model or ""
+        if name in self._resolved:
+            return self._resolved[name]
+
+        model = self.aliases.get(name, name)
+        price = self.prices.get(model)
+        if price is None:
+            prefixes = [name for name in self.prices if model.startswith(name)]
+            if prefixes:
+                price = self.prices[max(prefixes, key=len)]
+        if price is None:
+            price = self.default
+        if price is None:
+            self.unpriced_models.add(name)
+            logger.warning(f"No price configured for model {name} - cost will be reported as 0")
+
+        self._resolved[name] = price
+        return price
+
+    def cost(self, model: Optional[str], prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """
+        Estimated USD cost of one call.
+
+        Args:
+            model: Model that served the call
+            prompt_tokens: Prompt tokens, including cached ones
+            completion_tokens: Completion tokens
+            cached_tokens: Prompt tokens served from the provider's prefix cache
+
+        Returns:
+            Cost in USD
+        """
+        price = self.get(model)
+        if price is None:
+            return 0.0
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        return (
+            (prompt_tokens - cached_tokens) * price.input
+            + cached_tokens * price.cached_input
+            + completion_tokens * price.output
+        ) / 1_000_000
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "models": len(self.prices),
+            "has_default": self.default is not None,
+            "aliases": dict(self.aliases),
+            "unpriced_models": sorted(self.unpriced_models)
+        }
+
+
+# Global price table instance
+price_table = PriceTable()
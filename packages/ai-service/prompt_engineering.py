@@ -8,8 +8,50 @@ import logging
 from typing import Dict, Any, List, Optional
 from enum import Enum
 
+from json_extraction import IncrementalJSONExtractor
+
 logger = logging.getLogger(__name__)
 
+# JSON output contract shared by all structured prompts
+OUTPUT_FORMAT = """OUTPUT FORMAT:
+{
+    "content": "The generated section content",
+    "confidence": 0.85,
+    "rationale": "Explanation of how survey notes support this content",
+    "sources": ["Specific quotes or references from survey notes"],
+    "missing_info": ["List any critical information not found in survey notes"]
+}"""
+
+# Appended to schema-driven section prompts when structured output is requested
+STRUCTURED_OUTPUT_INSTRUCTIONS = f"""
+STRUCTURED OUTPUT (REQUIRED):
+Respond with a single valid JSON object and nothing else - no code fences, no commentary.
+Put the complete section text, in the required output format, in "content" as one string; rules are enforced on it.
+List in "missing_info" any critical information the survey notes do not provide.
+
+{OUTPUT_FORMAT}
+"""
+
+
+def _as_list(value: Any) -> List[Any]:
+    """List-valued output field as a list (models sometimes return null or a single string)"""
+    if value is None or value == "":
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _as_text(value: Any) -> str:
+    """Text-valued output field as a string (models sometimes return lists/objects)"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "\n".join(item if isinstance(item, str) else json.dumps(item) for item in value)
+    return json.dumps(value, indent=2)
+
 
 class SectionType(str, Enum):
     """Proposal section types"""
@@ -32,6 +74,12 @@ class PromptEngineer:
             SectionType.TIMELINE: self._timeline_template,
             SectionType.PRICING: self._pricing_template
         }
+        
+        # Base system messages (role + JSON output contract) are static - render them once
+        self.base_system_messages = {
+            section_type: self._render_base_system_message(section_type)
+            for section_type in SectionType
+        }
     
     def create_generation_prompt(
         self,
@@ -84,7 +132,22 @@ class PromptEngineer:
         rules: Optional[List[Dict[str, Any]]] = None
     ) -> str:
         """Build system message with role definition and rules"""
-        base_message = f"""You are an expert proposal writer generating the {section_type.value.replace('_', ' ')} section of a business proposal.
+        base_message = self.base_system_messages[section_type]
+        
+        # Add rules if provided
+        if rules:
+            rules_lines = []
+            for i, rule in enumerate(rules, 1):
+                rules_lines.append(f"{i}. {rule.get('description', 'No description')}\n")
+                if rule.get('constraints'):
+                    rules_lines.append(f"   Constraints: {rule['constraints']}\n")
+            return base_message + "\n\nADMIN-DEFINED RULES (MUST FOLLOW):\n" + "".join(rules_lines)
+        
+        return base_message
+    
+    def _render_base_system_message(self, section_type: SectionType) -> str:
+        """Render the static role definition and JSON output contract for a section type"""
+        return f"""You are an expert proposal writer generating the {section_type.value.replace('_', ' ')} section of a business proposal.
 
 Your task is to analyze REAL survey notes provided by the user and generate a professional, structured proposal section.
 
@@ -96,25 +159,7 @@ CRITICAL REQUIREMENTS:
 5. Include rationale explaining which parts of the survey notes influenced your response
 6. Format your response as valid JSON
 
-OUTPUT FORMAT:
-{{
-    "content": "The generated section content",
-    "confidence": 0.85,
-    "rationale": "Explanation of how survey notes support this content",
-    "sources": ["Specific quotes or references from survey notes"],
-    "missing_info": ["List any critical information not found in survey notes"]
-}}"""
-        
-        # Add rules if provided
-        if rules:
-            rules_text = "\n\nADMIN-DEFINED RULES (MUST FOLLOW):\n"
-            for i, rule in enumerate(rules, 1):
-                rules_text += f"{i}. {rule.get('description', 'No description')}\n"
-                if rule.get('constraints'):
-                    rules_text += f"   Constraints: {rule['constraints']}\n"
-            base_message += rules_text
-        
-        return base_message
+{OUTPUT_FORMAT}"""
     
     def _executive_summary_template(
         self,
@@ -253,31 +298,54 @@ Remember to include confidence score, rationale, sources, and any missing inform
             response_content: Raw LLM response
         
         Returns:
-            Parsed response dict with content, confidence, rationale, etc.
+            Parsed response dict: content and rationale as str, confidence as float
+            in [0, 1], sources and missing_info as lists of str
         """
         try:
-            # Try to parse as JSON
-            parsed = json.loads(response_content)
+            # Fast path: the whole response is a JSON object
+            try:
+                parsed = json.loads(response_content)
+            except json.JSONDecodeError:
+                # Tolerant path: code fences, surrounding prose or truncated output
+                extractor = IncrementalJSONExtractor()
+                extractor.feed(response_content)
+                parsed = extractor.finish()
+                if parsed is None:
+                    raise
+                if not extractor.done:
+                    parsed["missing_info"] = _as_list(parsed.get("missing_info")) + [
+                        "Complete structured response (output was truncated)"
+                    ]
+                logger.info("Extracted JSON object from non-strict LLM response", extra={
+                    "fields": list(parsed.keys()),
+                    "truncated": not extractor.done
+                })
             
             # Validate required fields
-            if "content" not in parsed:
+            if not isinstance(parsed, dict) or "content" not in parsed:
                 raise ValueError("Response missing 'content' field")
             
-            # Ensure confidence is in valid range
-            confidence = parsed.get("confidence", 0.5)
+            # Ensure confidence is a number in valid range
+            try:
+                confidence = float(parsed.get("confidence", 0.5))
+            except (TypeError, ValueError):
+                confidence = 0.5
+            parsed["confidence"] = confidence
             if not (0.0 <= confidence <= 1.0):
                 logger.warning(f"Invalid confidence score: {confidence}, clamping to [0.0, 1.0]")
                 confidence = max(0.0, min(1.0, confidence))
                 parsed["confidence"] = confidence
             
-            # Ensure required fields exist
-            parsed.setdefault("rationale", "No rationale provided")
-            parsed.setdefault("sources", [])
-            parsed.setdefault("missing_info", [])
+            # Normalize field types: text fields to str, list fields to lists of str
+            parsed["content"] = _as_text(parsed["content"])
+            parsed["rationale"] = _as_text(parsed.get("rationale")) or "No rationale provided"
+            parsed["sources"] = [_as_text(item) for item in _as_list(parsed.get("sources")) if item]
+            parsed["missing_info"] = [_as_text(item) for item in _as_list(parsed.get("missing_info")) if item]
             
             return parsed
             
-        except json.JSONDecodeError as e:
+        except ValueError as e:
+            # Also covers json.JSONDecodeError
             logger.warning(f"Failed to parse LLM response as JSON: {str(e)}")
             
             # Fallback: treat entire response as content
@@ -0,0 +1,163 @@
+"""
+Prompt Templates - Section prompts compiled once per schema version.
+Rule text, section descriptions and output constraints do not depend on the request,
+so they are rendered once and only survey notes and guidance are substituted per call.
+Compiled text is byte-stable, which also keeps provider prefix caching effective.
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from schema_manager import ProposalSchema, SectionSchema, SectionRule
+from prompt_engineering import STRUCTURED_OUTPUT_INSTRUCTIONS
+
+logger = logging.getLogger(__name__)
+
+# Ask the model for the JSON output contract (content, confidence, rationale, sources, missing_info)
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+def _rules_block(title: str, rules: List[SectionRule]) -> str:
+    """Render a rules block (empty string when there are no rules)"""
+    if not rules:
+        return ""
+    lines = "".join(f"- {rule.name}: {rule.description}\n" for rule in rules)
+    return f"\n{title} (STRICTLY ENFORCED):\n{lines}"
+
+
+def _length_lines(section_schema: SectionSchema) -> str:
+    """Render min/max length constraints"""
+    lines = ""
+    if section_schema.min_length:
+        lines += f"Minimum Length: {section_schema.min_length} characters\n"
+    if section_schema.max_length:
+        lines += f"Maximum Length: {section_schema.max_length} characters\n"
+    return lines
+
+
+class CompiledSectionPrompt:
+    """Request-independent prompt parts for one schema section"""
+
+    def __init__(
+        self,
+        section_schema: SectionSchema,
+        global_rules: List[SectionRule],
+        structured_output: bool = False
+    ):
+        output_contract = STRUCTURED_OUTPUT_INSTRUCTIONS if structured_output else ""
+
+        # section_first layout: section description and rules in the system message
+        self.system_message = (
+            f"You are generating the {section_schema.display_name} section of a business proposal.\n"
+            f"\n"
+            f"Section Description: {section_schema.description}\n"
+            f"\n"
+            f"CRITICAL: Your output will be ENFORCED against strict rules. You MUST:\n"
+            f"1. Base content ONLY on the actual survey notes provided\n"
+            f"2. Follow the required output format: {section_schema.output_format}\n"
+            f"3. Comply with all section rules\n"
+            f"\n"
+            + _rules_block("SECTION RULES", section_schema.rules)
+            + _rules_block("GLOBAL RULES", global_rules)
+            + output_contract
+        )
+
+        # section_first layout: notes and guidance are substituted between header and footer
+        self.user_prompt_header = (
+            f"Generate the {section_schema.display_name} section based on these REAL survey notes:\n"
+            f"\n"
+            f"SURVEY NOTES:\n"
+        )
+        template = f"\nTEMPLATE:\n{section_schema.template}\n" if section_schema.template else ""
+        self.user_prompt_footer = (
+            template
+            + f"\nOutput Format: {section_schema.output_format}\n"
+            + _length_lines(section_schema)
+        )
+
+        # shared_prefix layout: everything section-specific lives in the user prompt
+        self.section_prompt = (
+            f"Generate the {section_schema.display_name} section based on the survey notes above.\n"
+            f"\n"
+            f"Section Description: {section_schema.description}\n"
+            + _rules_block("SECTION RULES", section_schema.rules)
+            + template
+            + f"\nOutput Format: {section_schema.output_format}\n"
+            + _length_lines(section_schema)
+        )
+
+    def render_user_prompt(self, survey_notes: str, additional_guidance: Optional[str]) -> str:
+        """Substitute request-specific notes and guidance (section_first layout)"""
+        guidance = f"\nADDITIONAL GUIDANCE:\n{additional_guidance}\n" if additional_guidance else ""
+        return f"{self.user_prompt_header}{survey_notes}\n{guidance}{self.user_prompt_footer}"
+
+
+class CompiledSchemaPrompts:
+    """Compiled prompts for all sections of one schema version"""
+
+    SHARED_INSTRUCTIONS = (
+        "You are generating sections of a business proposal, one section per request.\n"
+        "\n"
+        "CRITICAL: Your output will be ENFORCED against strict rules. You MUST:\n"
+        "1. Base content ONLY on the actual survey notes provided\n"
+        "2. Follow the required output format of the requested section\n"
+        "3. Comply with all section rules and global rules\n"
+        "\n"
+    )
+
+    def __init__(self, schema: ProposalSchema, structured_output: bool = False):
+        self.schema = schema
+        self.structured_output = structured_output
+        self.sections: Dict[str, CompiledSectionPrompt] = {
+            section.name: CompiledSectionPrompt(section, schema.global_rules, structured_output)
+            for section in schema.sections
+        }
+        self.shared_system_header = (
+            self.SHARED_INSTRUCTIONS
+            + _rules_block("GLOBAL RULES", schema.global_rules)
+            + (STRUCTURED_OUTPUT_INSTRUCTIONS if structured_output else "")
+        )
+
+    def render_shared_system_message(self, survey_notes: str, additional_guidance: Optional[str]) -> str:
+        """Substitute notes and guidance into the shared system message (shared_prefix layout)"""
+        # Guidance goes after the notes so a guidance change keeps the notes prefix cacheable
+        guidance = f"\nADDITIONAL GUIDANCE:\n{additional_guidance}\n" if additional_guidance else ""
+        return f"{self.shared_system_header}\nSURVEY NOTES:\n{survey_notes}\n{guidance}"
+
+
+class PromptTemplateCache:
+    """
+    Caches compiled prompts per (schema id, version).
+    A reloaded schema is a new object, so entries are recompiled when the cached
+    schema object is no longer the one being used.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, str], CompiledSchemaPrompts] = {}
+        self.compilations = 0
+
+    def get(self, schema: ProposalSchema) -> CompiledSchemaPrompts:
+        """Get (or compile) the prompts for a schema"""
+        key = (schema.id, schema.version)
+        compiled = self._compiled.get(key)
+        if compiled is None or compiled.schema is not schema:
+            compiled = CompiledSchemaPrompts(schema, STRUCTURED_OUTPUT)
+            # Only one version per schema id is loaded at a time - drop older versions
+            for stale_key in [k for k in self._compiled if k[0] == schema.id]:
+                del self._compiled[stale_key]
+            self._compiled[key] = compiled
+            self.compilations += 1
+            logger.info(f"Compiled prompt templates for schema {schema.id} v{schema.version}", extra={
+                "schema_id": schema.id,
+                "sections": len(compiled.sections)
+            })
+        return compiled
+
+    def get_section(self, schema: ProposalSchema, section_name: str) -> CompiledSectionPrompt:
+        """Get the compiled prompt for one section of a schema"""
+        return self.get(schema).sections[section_name]
+
+
+# Global prompt template cache instance
+prompt_template_cache = PromptTemplateCache()
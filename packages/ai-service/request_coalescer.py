@@ -0,0 +1,151 @@
+"""
+Request Coalescer - Single-flight deduplication and idempotency for draft generation.
+Concurrent identical requests (double submits, retries after a client timeout) share one
+in-flight generation instead of each paying for the full set of LLM calls, and retries
+carrying the same Idempotency-Key get the stored result for a short time.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCoalescer:
+    """
+    Shares in-flight work between identical requests and replays completed
+    results for idempotency keys.
+    """
+
+    def __init__(self):
+        self.idempotency_ttl = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+        self.max_entries = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000"))
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self._completed: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+        # Metrics
+        self.executions = 0
+        self.coalesced = 0
+        self.idempotent_replays = 0
+        self.abandoned = 0
+
+    @staticmethod
+    def request_key(*parts: Any) -> str:
+        """Content hash identifying a request"""
+        encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _get_completed(self, key: str) -> Optional[Any]:
+        """Return a stored result if it has not expired"""
+        now = time.monotonic()
+        # Entries are stored in insertion order, so expired ones are at the front
+        while self._completed:
+            oldest_key, (expires_at, _) = next(iter(self._completed.items()))
+            if expires_at > now:
+                break
+            del self._completed[oldest_key]
+
+        entry = self._completed.get(key)
+        return entry[1] if entry else None
+
+    def _store_completed(self, key: str, result: Any):
+        self._completed[key] = (time.monotonic() + self.idempotency_ttl, result)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        """Forget finished work (and mark its exception retrieved if nobody awaited it)"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        idempotency_key: Optional[str] = None,
+        should_store: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Run work once per key, sharing the result with concurrent callers.
+        The shared work is cancelled when every caller waiting for it has been cancelled.
+
+        Args:
+            key: Content hash of the request
+            factory: Creates the awaitable doing the actual work
+            idempotency_key: Client-provided key; completed results are replayed for it
+            should_store: Decides whether a result may be replayed (default: always)
+
+        Returns:
+            Result of the (possibly shared) work
+        """
+        # Scope the idempotency key to the request content, so a reused key
+        # with a different body is treated as a new request
+        stored_key = f"{idempotency_key}|{key}" if idempotency_key else None
+
+        if stored_key:
+            stored = self._get_completed(stored_key)
+            if stored is not None:
+                self.idempotent_replays += 1
+                logger.info("Replaying stored result for idempotency key", extra={
+                    "idempotency_key": idempotency_key
+                })
+                return stored
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info("Coalescing identical in-flight request", extra={"request_key": key[:16]})
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+
+        # Shield: one caller going away must not cancel work other callers are waiting for
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                # Last interested caller is gone - stop the work
+                self.abandoned += 1
+                task.cancel()
+                # The task stays alive through its cancellation cleanup; a new identical
+                # request must start fresh work instead of joining the dying task
+                self._inflight.pop(key, None)
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+        if stored_key and (should_store is None or should_store(result)):
+            self._store_completed(stored_key, result)
+
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Coalescing metrics"""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "idempotent_replays": self.idempotent_replays,
+            "abandoned": self.abandoned,
+            "stored_results": len(self._completed)
+        }
+
+
+# Global request coalescer instance
+request_coalescer = RequestCoalescer()
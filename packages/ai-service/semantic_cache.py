@@ -0,0 +1,192 @@
+"""
+Semantic Cache - Near-duplicate completion cache using local hashed signatures.
+Many drafts come from near-identical survey notes (templated intake forms with a few
+fields changed). Prompts are reduced to bottom-k MinHash sketches of word shingles, so
+near-duplicates are found fully offline, without an external embedding service.
+"""
+
+import os
+import re
+import time
+import heapq
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, FrozenSet, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Mask to keep shingle hashes non-negative 64-bit integers
+HASH_MASK = (1 << 64) - 1
+
+
+class CacheEntry:
+    """A cached completion with its prompt signature"""
+
+    def __init__(
+        self,
+        namespace: str,
+        sketch: FrozenSet[int],
+        prompt_words: Set[str],
+        result: Dict[str, Any]
+    ):
+        self.namespace = namespace
+        self.sketch = sketch
+        self.prompt_words = prompt_words
+        self.completion_words = set(WORD_PATTERN.findall(str(result.get("content", "")).lower()))
+        self.result = result
+        self.created_at = time.monotonic()
+        self.hits = 0
+
+
+class SemanticCompletionCache:
+    """
+    Near-duplicate completion cache keyed by (namespace, prompt signature).
+
+    - Exact duplicates are found by content hash in O(1)
+    - Near-duplicates are found by estimated Jaccard similarity of word-shingle sketches
+    - A near-duplicate is only served when none of the words that differ between the
+      prompts appear in the cached completion (otherwise it would echo stale details)
+    - LRU eviction with a TTL; hit rate is reported in stats
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+        self.ttl = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+        self.sketch_size = int(os.getenv("SEMANTIC_CACHE_SKETCH_SIZE", "128"))
+        self.shingle_size = 3
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+        self.near_duplicate_hits = 0
+        self.rejected_unsafe = 0
+        self.evictions = 0
+
+        logger.info("Semantic Cache initialized", extra={
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_entries": self.max_entries
+        })
+
+    def _signature(self, text: str) -> Tuple[str, FrozenSet[int], Set[str]]:
+        """Normalize text and compute (exact key, bottom-k sketch, word set)"""
+        words = WORD_PATTERN.findall(text.lower())
+        exact_key = hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest()
+
+        size = self.shingle_size
+        shingle_hashes = {
+            hash(tuple(words[i:i + size])) & HASH_MASK
+            for i in range(max(1, len(words) - size + 1))
+        }
+        sketch = frozenset(heapq.nsmallest(self.sketch_size, shingle_hashes))
+        return exact_key, sketch, set(words)
+
+    def _similarity(self, sketch_a: FrozenSet[int], sketch_b: FrozenSet[int]) -> float:
+        """Estimate Jaccard similarity from two bottom-k sketches"""
+        union_sketch = heapq.nsmallest(self.sketch_size, sketch_a | sketch_b)
+        if not union_sketch:
+            return 0.0
+        shared = sketch_a & sketch_b
+        return sum(1 for value in union_sketch if value in shared) / len(union_sketch)
+
+    def _expire(self, now: float):
+        """Drop expired entries from the LRU front (hits move entries back, so lookup re-checks its match)"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.created_at <= self.ttl:
+                break
+            del self._entries[key]
+            self.evictions += 1
+
+    def lookup(self, namespace: str, prompt_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached completion for an identical or near-identical prompt.
+
+        Args:
+            namespace: Exact-match scope (section, model and sampling parameters)
+            prompt_text: Full prompt text (system message + user prompt)
+
+        Returns:
+            Copy of the cached result with "cache_similarity", or None on miss
+        """
+        if not self.enabled:
+            return None
+
+        self.lookups += 1
+        now = time.monotonic()
+        self._expire(now)
+        exact_key, sketch, prompt_words = self._signature(prompt_text)
+
+        best_key, best_similarity = None, 0.0
+        entry = self._entries.get(f"{namespace}|{exact_key}")
+        if entry is not None and now - entry.created_at > self.ttl:
+            del self._entries[f"{namespace}|{exact_key}"]
+            self.evictions += 1
+            entry = None
+        if entry is not None:
+            best_key, best_similarity = f"{namespace}|{exact_key}", 1.0
+        else:
+            for key, candidate in self._entries.items():
+                if candidate.namespace != namespace or now - candidate.created_at > self.ttl:
+                    continue
+                similarity = self._similarity(sketch, candidate.sketch)
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+
+        if best_key is None:
+            return None
+
+        entry = self._entries[best_key]
+        if best_similarity < 1.0:
+            # Details that changed between the prompts must not appear in the cached answer
+            changed_words = entry.prompt_words - prompt_words
+            if changed_words & entry.completion_words:
+                self.rejected_unsafe += 1
+                return None
+            self.near_duplicate_hits += 1
+
+        self._entries.move_to_end(best_key)
+        entry.hits += 1
+        self.hits += 1
+
+        result = dict(entry.result)
+        result["cache_similarity"] = round(best_similarity, 3)
+        return result
+
+    def store(self, namespace: str, prompt_text: str, result: Dict[str, Any]):
+        """Store a completion result for a prompt"""
+        if not self.enabled:
+            return
+
+        exact_key, sketch, prompt_words = self._signature(prompt_text)
+        key = f"{namespace}|{exact_key}"
+        self._entries[key] = CacheEntry(namespace, sketch, prompt_words, result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache metrics"""
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_duplicate_hits,
+            "rejected_unsafe": self.rejected_unsafe,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0
+        }
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCompletionCache()
@@ -0,0 +1,58 @@
+"""
+Serialization - Fast JSON encoding for service-built response payloads.
+Draft responses are assembled by the service itself, so they skip pydantic re-validation
+and FastAPI's jsonable_encoder and go straight to orjson (stdlib json as fallback).
+"""
+
+import os
+import json
+import logging
+from typing import Any
+
+from fastapi.responses import Response
+
+# orjson is optional - the stdlib encoder is used when it is not installed
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Toggle for the fast path (falls back to the regular response_model path when disabled)
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() == "true"
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a JSON-compatible payload to bytes.
+
+    Args:
+        content: Plain dicts/lists/scalars (e.g. the output of model_dump())
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson when available.
+    Returning a Response from an endpoint bypasses response_model validation,
+    so only use it for payloads the service built and already trusts.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+logger.info("Serialization initialized", extra={
+    "json_backend": JSON_BACKEND,
+    "fast_json_responses": FAST_JSON_RESPONSES
+})
@@ -0,0 +1,164 @@
+"""
+Survey Index - Lightweight in-process BM25 index over a request's survey notes.
+Section prompts include only the note chunks relevant to that section, and the
+same index maps generated content back to the notes for source references.
+"""
+
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import List, Tuple, Optional
+
+from schema_manager import SectionSchema
+
+logger = logging.getLogger(__name__)
+
+# Retrieval configuration
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+RETRIEVAL_MIN_TOKENS = int(os.getenv("RETRIEVAL_MIN_TOKENS", "1500"))  # Shorter notes are sent whole
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "150"))
+SOURCE_REFERENCES_TOP_K = int(os.getenv("SOURCE_REFERENCES_TOP_K", "3"))
+SOURCE_REFERENCE_MAX_CHARS = 200
+
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+TERM_PATTERN = re.compile(r'[a-z0-9]+(?:[\'.][a-z0-9]+)*')
+
+# Common words carry no signal for section relevance
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its itself just me more most my no
+nor not now of off on once only or other our ours out over own same she should so some such than
+that the their theirs them then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word terms without stopwords"""
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def section_query(section_schema: SectionSchema, additional_guidance: Optional[str] = None) -> str:
+    """Build the retrieval query for a section from its description, rules and template"""
+    parts = [section_schema.display_name, section_schema.description]
+    for rule in section_schema.rules:
+        parts.append(f"{rule.name} {rule.description}")
+    if section_schema.template:
+        parts.append(section_schema.template)
+    if additional_guidance:
+        parts.append(additional_guidance)
+    return " ".join(parts)
+
+
+class SurveyNotesIndex:
+    """
+    BM25 index over paragraph chunks of one request's survey notes.
+    Built once per request; chunk order is preserved so selections read naturally.
+    """
+
+    def __init__(
+        self,
+        survey_notes: str,
+        chunk_words: int = RETRIEVAL_CHUNK_WORDS,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.k1 = k1
+        self.b = b
+        self.chunks = self._chunk(survey_notes, chunk_words)
+        chunk_tokens = [tokenize(chunk) for chunk in self.chunks]
+        self.chunk_terms = [Counter(tokens) for tokens in chunk_tokens]
+        # Adjacent content-word pairs, for cheap lexical support checks (see confidence.py)
+        self.bigrams = {
+            pair
+            for tokens in chunk_tokens
+            for pair in zip(tokens, tokens[1:])
+        }
+        self.chunk_lengths = [sum(terms.values()) for terms in self.chunk_terms]
+        self.avg_length = (sum(self.chunk_lengths) / len(self.chunks)) if self.chunks else 0.0
+
+        doc_freq = Counter()
+        for terms in self.chunk_terms:
+            doc_freq.update(terms.keys())
+
+        total = len(self.chunks)
+        self.idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in doc_freq.items()
+        }
+
+        logger.debug(f"Survey notes indexed: {len(self.chunks)} chunks, {len(self.idf)} terms")
+
+    @staticmethod
+    def _chunk(survey_notes: str, chunk_words: int) -> List[str]:
+        """Split notes into paragraphs, breaking long paragraphs into word windows"""
+        chunks = []
+        for paragraph in PARAGRAPH_SPLIT.split(survey_notes):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            words = paragraph.split()
+            if len(words) <= chunk_words:
+                chunks.append(paragraph)
+                continue
+            for start in range(0, len(words), chunk_words):
+                chunks.append(" ".join(words[start:start + chunk_words]))
+        return chunks
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Rank chunks against a query.
+
+        Args:
+            query: Free text query
+            top_k: Maximum number of results
+
+        Returns:
+            List of (chunk_index, score) sorted by descending score, zero scores excluded
+        """
+        query_terms = set(tokenize(query)) & self.idf.keys()
+        if not query_terms or not self.chunks:
+            return []
+
+        scores = []
+        for index, terms in enumerate(self.chunk_terms):
+            length_norm = self.k1 * (1 - self.b + self.b * self.chunk_lengths[index] / self.avg_length)
+            score = 0.0
+            for term in query_terms:
+                freq = terms.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + length_norm)
+            if score > 0:
+                scores.append((index, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:top_k]
+
+    def select(self, query: str, top_k: int = RETRIEVAL_TOP_K) -> str:
+        """
+        Select the most relevant chunks for a query, joined in original note order.
+        Falls back to the leading chunks when nothing matches the query.
+        """
+        selected = sorted(index for index, _ in self.search(query, top_k))
+        if not selected:
+            selected = list(range(min(top_k, len(self.chunks))))
+
+        excerpt = "\n\n".join(self.chunks[index] for index in selected)
+        omitted = len(self.chunks) - len(selected)
+        if omitted:
+            excerpt += f"\n\n[Only the most relevant excerpts are shown; {omitted} other chunk(s) of the survey notes were omitted]"
+        return excerpt
+
+    def references(self, content: str, top_k: int = SOURCE_REFERENCES_TOP_K) -> List[str]:
+        """Chunks of the notes that best support generated content, shortened for display"""
+        references = []
+        for index, _ in self.search(content, top_k):
+            chunk = self.chunks[index]
+            if len(chunk) > SOURCE_REFERENCE_MAX_CHARS:
+                chunk = chunk[:SOURCE_REFERENCE_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+            references.append(chunk)
+        return references
@@ -0,0 +1,8 @@
+"""
+Pytest configuration - service modules are flat, import them from the service directory.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
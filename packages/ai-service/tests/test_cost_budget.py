@@ -0,0 +1,171 @@
+"""
+Tests for cost budget reservations (CostBudget.reserve, Reservation.settle/release).
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import cost_budget as cost_budget_module
+from cost_budget import BudgetExceeded, CostBudget
+from pricing import PriceTable
+from usage_ledger import usage_tags
+
+# USD per 1M tokens: a 500 + 500 token call costs $0.01 on "premium", $0.001 on "budget"
+PRICES = {
+    "models": {
+        "premium": {"input": 10.0, "output": 10.0},
+        "budget": {"input": 1.0, "output": 1.0}
+    }
+}
+
+
+class FakeLedger:
+    """Usage ledger returning a fixed spend, running a hook while the query is in flight"""
+
+    enabled = True
+
+    def __init__(self, tokens=0, cost=0.0):
+        self.tokens = tokens
+        self.cost = cost
+        self.queries = 0
+        self.during_query = None
+
+    async def spend(self, since=0.0, **filters):
+        self.queries += 1
+        await asyncio.sleep(0)
+        if self.during_query:
+            self.during_query()
+        return self.tokens, self.cost
+
+
+@pytest.fixture
+def ledger(monkeypatch, tmp_path):
+    path = tmp_path / "prices.json"
+    path.write_text(json.dumps(PRICES))
+    monkeypatch.setattr(cost_budget_module, "price_table", PriceTable(str(path)))
+    fake = FakeLedger()
+    monkeypatch.setattr(cost_budget_module, "usage_ledger", fake)
+    return fake
+
+
+def make_budget(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, str(value))
+    return CostBudget()
+
+
+def test_concurrent_reservations_cannot_overshoot(monkeypatch, ledger):
+    budget = make_budget(monkeypatch, COST_BUDGET_PROPOSAL_TOKENS=2500)
+
+    async def main():
+        with usage_tags(proposal_id="p-1"):
+            return await asyncio.gather(
+                *(budget.reserve(500, 500, "premium") for _ in range(5)),
+                return_exceptions=True
+            )
+
+    results = asyncio.run(main())
+    granted = [result for result in results if not isinstance(result, BaseException)]
+    rejected = [result for result in results if isinstance(result, BudgetExceeded)]
+
+    assert len(granted) == 2
+    assert len(rejected) == 3
+    assert budget.rejected["proposal"] == 3
+
+
+def test_downgrade_only_for_usd_violations(monkeypatch, ledger):
+    budget = make_budget(
+        monkeypatch,
+        COST_BUDGET_DRAFT_USD=0.005,
+        COST_BUDGET_DRAFT_TOKENS=1500,
+        COST_BUDGET_DOWNGRADE_MODEL="budget"
+    )
+
+    async def main():
+        with budget.draft_scope():
+            reservation = await budget.reserve(500, 500, "premium")
+            assert reservation.model == "budget"
+            assert reservation.downgraded
+            # Second call fits the USD limit on the cheaper model but not the token limit
+            with pytest.raises(BudgetExceeded) as excinfo:
+                await budget.reserve(500, 500, "premium")
+            assert excinfo.value.unit == "tokens"
+
+    asyncio.run(main())
+    assert budget.downgraded == 1
+
+
+def test_unpriced_model_fails_closed_under_usd_limit(monkeypatch, ledger):
+    budget = make_budget(monkeypatch, COST_BUDGET_DRAFT_USD=100, COST_BUDGET_DOWNGRADE_MODEL="budget")
+
+    async def main():
+        with budget.draft_scope():
+            await budget.reserve(500, 500, "unknown-model")
+
+    with pytest.raises(BudgetExceeded) as excinfo:
+        asyncio.run(main())
+    assert excinfo.value.unit == "USD"
+    assert "no price" in str(excinfo.value)
+
+
+def test_unpriced_model_allowed_under_token_limit(monkeypatch, ledger):
+    budget = make_budget(monkeypatch, COST_BUDGET_DRAFT_TOKENS=5000)
+
+    async def main():
+        with budget.draft_scope():
+            return await budget.reserve(500, 500, "unknown-model")
+
+    reservation = asyncio.run(main())
+    assert reservation.model == "unknown-model"
+
+
+def test_settle_and_release_are_idempotent(monkeypatch, ledger):
+    budget = make_budget(monkeypatch, COST_BUDGET_PROPOSAL_TOKENS=10000)
+
+    async def main():
+        with usage_tags(proposal_id="p-1"):
+            return await budget.reserve(500, 500, "premium")
+
+    reservation = asyncio.run(main())
+    spend = reservation.spends[0]
+    assert spend.pending_tokens == 1000
+
+    reservation.settle(300, 0.003)
+    reservation.settle(300, 0.003)
+    reservation.release()
+
+    assert spend.pending_tokens == 0
+    assert spend.pending_cost == pytest.approx(0.0)
+    assert spend.tokens == 300
+    assert spend.cost == pytest.approx(0.003)
+
+    released = asyncio.run(main())
+    released.release()
+    released.release()
+    assert spend.pending_tokens == 0
+    assert spend.tokens == 300
+
+
+def test_ledger_refresh_adds_back_calls_settled_during_query(monkeypatch, ledger):
+    budget = make_budget(monkeypatch, COST_BUDGET_PROPOSAL_TOKENS=10000, COST_BUDGET_REFRESH_SECONDS=0)
+
+    async def reserve():
+        with usage_tags(proposal_id="p-1"):
+            return await budget.reserve(500, 500, "premium")
+
+    async def main():
+        first = await reserve()
+        # The ledger snapshot (100 tokens) predates a call settling while the query runs
+        ledger.tokens, ledger.cost = 100, 0.001
+        ledger.during_query = lambda: first.settle(300, 0.003)
+        second = await reserve()
+        return first.spends[0], second
+
+    spend, second = asyncio.run(main())
+
+    assert ledger.queries == 2
+    assert spend.tokens == 400
+    assert spend.cost == pytest.approx(0.004)
+    assert spend.pending_tokens == second.tokens
@@ -0,0 +1,131 @@
+"""
+Tests for structured LLM output parsing (PromptEngineer.parse_llm_response).
+"""
+
+import json
+
+import pytest
+
+from prompt_engineering import prompt_engineer
+
+RESPONSE = {
+    "content": "Install 24 access points over two weekends.",
+    "confidence": 0.8,
+    "rationale": "Survey notes list the access points and cutover window",
+    "sources": ["24 access points"],
+    "missing_info": ["Cabling budget"]
+}
+
+TRUNCATION_NOTE = "Complete structured response (output was truncated)"
+
+
+def test_strict_json():
+    parsed = prompt_engineer.parse_llm_response(json.dumps(RESPONSE))
+
+    assert parsed == RESPONSE
+
+
+def test_fenced_json():
+    response = f"```json\n{json.dumps(RESPONSE, indent=2)}\n```"
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["content"] == RESPONSE["content"]
+    assert parsed["missing_info"] == ["Cabling budget"]
+
+
+def test_prose_wrapped_json():
+    response = f"Here is the section you asked for:\n{json.dumps(RESPONSE)}\nLet me know if you need changes."
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["content"] == RESPONSE["content"]
+    assert parsed["confidence"] == 0.8
+    assert parsed["sources"] == ["24 access points"]
+
+
+def test_prose_braces_before_json_are_skipped():
+    response = f"Using the {{section}} template: {json.dumps(RESPONSE)}"
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["content"] == RESPONSE["content"]
+
+
+def test_truncated_json_keeps_closed_fields():
+    response = json.dumps(RESPONSE)[:-30]
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["content"] == RESPONSE["content"]
+    assert parsed["confidence"] == 0.8
+    assert parsed["missing_info"][-1] == TRUNCATION_NOTE
+
+
+@pytest.mark.parametrize("missing_info, expected", [
+    ('"Cabling budget"', ["Cabling budget", TRUNCATION_NOTE]),
+    ("null", [TRUNCATION_NOTE]),
+    ('["Cabling budget"]', ["Cabling budget", TRUNCATION_NOTE])
+])
+def test_truncated_json_with_wrongly_typed_missing_info(missing_info, expected):
+    response = f'{{"content": "Install access points", "missing_info": {missing_info}, "rationale": "Based on'
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["content"] == "Install access points"
+    assert parsed["missing_info"] == expected
+
+
+def test_confidence_is_clamped_and_defaulted():
+    assert prompt_engineer.parse_llm_response('{"content": "x", "confidence": 3}')["confidence"] == 1.0
+    assert prompt_engineer.parse_llm_response('{"content": "x", "confidence": "high"}')["confidence"] == 0.5
+
+
+def test_unstructured_output_falls_back_to_content():
+    parsed = prompt_engineer.parse_llm_response("Install 24 access points.")
+
+    assert parsed["content"] == "Install 24 access points."
+    assert parsed["confidence"] == 0.5
+    assert parsed["missing_info"] == ["Structured response format"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, []),
+    ("Budget", ["Budget"]),
+    (["Budget", "", "Cutover date"], ["Budget", "Cutover date"]),
+    ([{"item": "Budget"}], ['{\n  "item": "Budget"\n}'])
+])
+def test_list_fields_are_normalized(value, expected):
+    response = json.dumps({"content": "x", "sources": value, "missing_info": value})
+
+    parsed = prompt_engineer.parse_llm_response(response)
+
+    assert parsed["sources"] == expected
+    assert parsed["missing_info"] == expected
+
+
+def test_missing_list_fields_default_to_empty():
+    parsed = prompt_engineer.parse_llm_response('{"content": "x"}')
+
+    assert parsed["sources"] == []
+    assert parsed["missing_info"] == []
+    assert parsed["rationale"] == "No rationale provided"
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Install access points", "Install access points"),
+    (["Phase 1", "Phase 2"], "Phase 1\nPhase 2"),
+    ({"phase": 1}, '{\n  "phase": 1\n}'),
+    (42, "42")
+])
+def test_text_fields_are_strings(value, expected):
+    parsed = prompt_engineer.parse_llm_response(json.dumps({"content": value, "rationale": value}))
+
+    assert parsed["content"] == expected
+    assert parsed["rationale"] == expected
+
+
+def test_null_rationale_gets_default():
+    parsed = prompt_engineer.parse_llm_response('{"content": "x", "rationale": null}')
+
+    assert parsed["rationale"] == "No rationale provided"
@@ -0,0 +1,92 @@
+"""
+Tests for single-flight request coalescing (RequestCoalescer.run).
+"""
+
+import asyncio
+
+import pytest
+
+from request_coalescer import RequestCoalescer
+
+
+def test_concurrent_callers_share_one_execution():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "draft"
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run("key", work) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["draft"] * 3
+    assert len(calls) == 1
+    assert coalescer.coalesced == 2
+
+
+def test_request_after_abandoned_work_starts_fresh():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Cancellation cleanup that awaits keeps the task alive for a moment
+            await asyncio.sleep(0.01)
+            raise
+        return "draft"
+
+    async def quick_work():
+        calls.append(1)
+        return "draft"
+
+    async def main():
+        first = asyncio.ensure_future(coalescer.run("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # Arrives while the abandoned task is still running its cleanup
+        return await coalescer.run("key", quick_work)
+
+    assert asyncio.run(main()) == "draft"
+    assert len(calls) == 2
+    assert coalescer.abandoned == 1
+    assert coalescer.get_stats()["in_flight"] == 0
+
+
+def test_idempotency_key_replays_stored_result():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return "draft"
+
+    async def main():
+        await coalescer.run("key", work, idempotency_key="retry-1")
+        return await coalescer.run("key", work, idempotency_key="retry-1")
+
+    assert asyncio.run(main()) == "draft"
+    assert len(calls) == 1
+    assert coalescer.idempotent_replays == 1
+
+
+def test_should_store_rejects_result():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return "partial"
+
+    async def main():
+        for _ in range(2):
+            await coalescer.run("key", work, idempotency_key="retry-1", should_store=lambda result: False)
+
+    asyncio.run(main())
+    assert len(calls) == 2
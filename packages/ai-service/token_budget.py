@@ -0,0 +1,210 @@
+"""
+Token Budget - Estimates prompt tokens locally and fits survey notes into a per-section budget.
+Oversized prompts are deduplicated and trimmed BEFORE they are sent, instead of failing
+after a full timeout or burning the most expensive tokens of the request.
+"""
+
+import os
+import re
+import math
+import logging
+import threading
+from typing import Dict, Any, List, Tuple, Optional
+
+# tiktoken is optional - a character-based estimate is used when it is unavailable
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on environment
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Paragraphs are separated by one or more blank lines
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+WHITESPACE = re.compile(r'\s+')
+
+# Rough average for English prose when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Headroom kept for the omission marker appended to trimmed notes
+OMISSION_MARKER_TOKENS = 20
+
+
+class TokenBudgetPlanner:
+    """
+    Counts prompt tokens with a local tokenizer and trims survey notes to fit
+    the prompt budget of a single section call.
+
+    The tokenizer is loaded on first use, not at import: on a cold tiktoken cache
+    get_encoding downloads the BPE file (pre-populate TIKTOKEN_CACHE_DIR to avoid it).
+    The service starts the load on a worker thread at startup; until it finishes,
+    counts use the character heuristic.
+    """
+
+    def __init__(self):
+        self.context_window = int(os.getenv("LLM_CONTEXT_WINDOW", "32768"))
+        self.prompt_token_budget = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "8000"))
+        self.encoding_name = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+        self._encoding = None
+        self._encoding_state = "unloaded"  # unloaded | loading | loaded | unavailable
+        self._encoding_lock = threading.Lock()
+
+        logger.info("Token Budget Planner initialized", extra={
+            "context_window": self.context_window,
+            "prompt_token_budget": self.prompt_token_budget,
+            "tokenizer": self.encoding_name if tiktoken is not None else "heuristic"
+        })
+
+    @property
+    def encoding(self):
+        """Tokenizer, loaded on first use (None while it loads elsewhere or is unavailable)"""
+        if self._encoding_state == "unloaded":
+            self.load_encoding()
+        return self._encoding
+
+    @property
+    def tokenizer(self) -> str:
+        """Name of what counts tokens right now (without triggering a load)"""
+        return self.encoding_name if self._encoding is not None else "heuristic"
+
+    def load_encoding(self):
+        """Load the tokenizer, falling back to the heuristic when it cannot be loaded (blocking)"""
+        with self._encoding_lock:
+            if self._encoding_state != "unloaded":
+                return
+            self._encoding_state = "loading"
+
+        encoding = None
+        if tiktoken is not None:
+            try:
+                encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                # Encodings are downloaded on first use - offline hosts fall back to the heuristic
+                logger.warning(f"Tokenizer {self.encoding_name} unavailable, using heuristic: {str(e)}")
+        self._encoding = encoding
+        self._encoding_state = "loaded" if encoding is not None else "unavailable"
+
+    def count_tokens(self, text: str) -> int:
+        """Count (or estimate) tokens in text"""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    def section_budget(self, completion_tokens: Optional[int] = None) -> int:
+        """
+        Prompt tokens available to one section call.
+
+        Args:
+            completion_tokens: Tokens reserved for the completion (max_tokens)
+
+        Returns:
+            Smaller of the configured prompt budget and what the context window leaves
+        """
+        completion_tokens = completion_tokens or 0
+        return max(0, min(self.prompt_token_budget, self.context_window - completion_tokens))
+
+    def split_paragraphs(self, survey_notes: str) -> List[str]:
+        """Split notes into non-empty paragraphs"""
+        return [p.strip() for p in PARAGRAPH_SPLIT.split(survey_notes) if p.strip()]
+
+    def dedupe_notes(self, survey_notes: str) -> str:
+        """
+        Remove repeated paragraphs (compared case- and whitespace-insensitively).
+        Pasted intake forms often repeat whole blocks, which cost tokens in every section.
+        """
+        seen = set()
+        unique = []
+        for paragraph in self.split_paragraphs(survey_notes):
+            key = WHITESPACE.sub(' ', paragraph).lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(paragraph)
+        return "\n\n".join(unique)
+
+    def fit_notes(
+        self,
+        survey_notes: str,
+        reserved_tokens: int,
+        completion_tokens: Optional[int] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fit survey notes into the tokens left after the rest of the prompt.
+
+        Paragraphs are kept in their original order; paragraphs that do not fit are
+        dropped and replaced by a single omission marker.
+
+        Args:
+            survey_notes: Survey notes (ideally already deduplicated)
+            reserved_tokens: Tokens used by the system message and prompt scaffolding
+            completion_tokens: Tokens reserved for the completion
+
+        Returns:
+            Tuple of (fitted_notes, plan) where plan describes what was trimmed
+        """
+        budget = self.section_budget(completion_tokens)
+        notes_budget = budget - reserved_tokens
+        original_tokens = self.count_tokens(survey_notes)
+
+        plan = {
+            "budget": budget,
+            "reserved_tokens": reserved_tokens,
+            "original_tokens": original_tokens,
+            "fitted_tokens": original_tokens,
+            "paragraphs_dropped": 0,
+            "trimmed": False
+        }
+
+        if original_tokens <= notes_budget:
+            return survey_notes, plan
+
+        if notes_budget <= 0:
+            logger.warning("Prompt scaffolding exceeds token budget, survey notes cannot be included", extra=plan)
+
+        notes_budget -= OMISSION_MARKER_TOKENS
+        kept = []
+        used = 0
+        dropped = 0
+        for paragraph in self.split_paragraphs(survey_notes):
+            # +2 accounts for the blank line separating paragraphs
+            paragraph_tokens = self.count_tokens(paragraph) + 2
+            if used + paragraph_tokens <= notes_budget:
+                kept.append(paragraph)
+                used += paragraph_tokens
+            else:
+                dropped += 1
+
+        # A single oversized paragraph would otherwise leave nothing - keep its head
+        if not kept and notes_budget > 0:
+            kept.append(self.truncate_to_tokens(survey_notes, notes_budget))
+            dropped -= 1
+
+        if dropped:
+            kept.append(f"[{dropped} paragraph(s) of survey notes omitted to fit the token budget]")
+
+        fitted = "\n\n".join(kept)
+        plan.update({
+            "fitted_tokens": self.count_tokens(fitted),
+            "paragraphs_dropped": dropped,
+            "trimmed": True
+        })
+
+        logger.info("Survey notes trimmed to fit token budget", extra=plan)
+        return fitted, plan
+
+
+# Global token budget planner instance
+token_budget_planner = TokenBudgetPlanner()
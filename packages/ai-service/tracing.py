@@ -0,0 +1,299 @@
+"""
+Tracing - Lightweight OpenTelemetry-style spans for the draft pipeline.
+Spans nest through context variables, so concurrent sections and LLM attempts each
+get their own parent chain. Finished traces go to a pluggable exporter; the built-in
+ones write OTLP/JSON lines to a file or a compact line per span to the console, so
+traces can be inspected offline. Disabled by default, in which case spans are no-ops.
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import logging
+import importlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from log_pipeline import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "ai-proposal-generation"
+# OTLP span status codes
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+class Span:
+    """A timed operation with attributes and events"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes", "events",
+        "start_ns", "end_ns", "status", "status_message"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, **attributes: Any):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def set_status(self, status: int, message: str = ""):
+        self.status = status
+        self.status_message = message
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled - accepts and ignores everything"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+    def add_event(self, name: str, **attributes: Any):
+        pass
+
+    def set_status(self, status: int, message: str = ""):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class SpanExporter:
+    """Exporter interface: receives batches of finished spans"""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """One compact JSON line per span on stderr"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            self.stream.write(json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "duration_ms": round(span.duration_ms, 3),
+                "status": span.status,
+                "attributes": span.attributes,
+                "events": [event["name"] for event in span.events]
+            }, default=str) + "\n")
+        self.stream.flush()
+
+
+class OTLPFileSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON ExportTraceServiceRequest per batch (JSON lines)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _span_to_otlp(self, span: Span) -> Dict[str, Any]:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [
+                {
+                    "timeUnixNano": str(event["time_ns"]),
+                    "name": event["name"],
+                    "attributes": _otlp_attributes(event["attributes"])
+                }
+                for event in span.events
+            ],
+            "status": {"code": span.status, "message": span.status_message}
+        }
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._span_to_otlp(span) for span in spans]
+                }]
+            }]
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, default=str) + "\n")
+
+
+def _create_exporter(name: str) -> Optional[SpanExporter]:
+    """Build an exporter from TRACING_EXPORTER: console | file | none | module:Class"""
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return OTLPFileSpanExporter(os.getenv("TRACING_FILE", "traces.jsonl"))
+    if name in ("", "none"):
+        return None
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class Tracer:
+    """
+    Creates spans and hands finished traces to the exporter.
+    Spans are buffered per trace until its root span ends (or the trace has
+    TRACING_MAX_BUFFER spans), so each trace is exported as one batch. Exports run
+    on a background thread, off the event loop.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.max_buffer = int(os.getenv("TRACING_MAX_BUFFER", "512"))
+        self.exporter: Optional[SpanExporter] = None
+        self._buffers: Dict[str, List[Span]] = {}
+        self._writer = BackgroundWriter(
+            "trace-exporter",
+            self._export,
+            int(os.getenv("TRACING_EXPORT_QUEUE_SIZE", "1000"))
+        )
+
+        if self.enabled:
+            exporter_name = os.getenv("TRACING_EXPORTER", "file")
+            try:
+                self.exporter = _create_exporter(exporter_name)
+            except Exception as e:
+                logger.error(f"Failed to create trace exporter {exporter_name}: {str(e)}")
+                self.enabled = False
+
+        logger.info("Tracer initialized", extra={
+            "enabled": self.enabled,
+            "exporter": type(self.exporter).__name__ if self.exporter else None
+        })
+
+    def set_exporter(self, exporter: Optional[SpanExporter]):
+        """Plug in an exporter (enables tracing when one is given)"""
+        self.flush()
+        self._writer.stop()
+        self.exporter = exporter
+        self.enabled = exporter is not None
+
+    def current_span(self):
+        """Active span of the current task (no-op span if none)"""
+        return _current_span.get() or NOOP_SPAN
+
+    def add_event(self, name: str, **attributes: Any):
+        """Add an event to the active span"""
+        self.current_span().add_event(name, **attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Time the block as a child of the active span.
+
+        Exceptions mark the span as failed and propagate; cancellation is recorded
+        as an event so abandoned work stays visible in the trace.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(
+            name,
+            parent.trace_id if parent else secrets.token_hex(16),
+            parent.span_id if parent else None,
+            attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if isinstance(e, Exception):
+                span.set_status(STATUS_ERROR, str(e))
+                span.add_event("exception", **{"exception.type": type(e).__name__, "exception.message": str(e)})
+            else:
+                span.add_event("cancelled")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            buffer = self._buffers.setdefault(span.trace_id, [])
+            buffer.append(span)
+            if parent is None or len(buffer) >= self.max_buffer:
+                self.flush(span.trace_id)
+
+    def flush(self, trace_id: Optional[str] = None):
+        """Queue the buffered spans of one trace (default: all traces) for export"""
+        trace_ids = [trace_id] if trace_id is not None else list(self._buffers)
+        for buffered_trace_id in trace_ids:
+            spans = self._buffers.pop(buffered_trace_id, None)
+            if spans and self.exporter is not None:
+                self._writer.submit((self.exporter, spans))
+
+    def stop(self):
+        """Export all buffered spans and wait for queued exports"""
+        self.flush()
+        self._writer.stop()
+
+    @staticmethod
+    def _export(batch: Tuple[SpanExporter, List[Span]]):
+        exporter, spans = batch
+        exporter.export(spans)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "buffered_traces": len(self._buffers),
+            "export": self._writer.get_stats()
+        }
+
+
+# Global tracer instance
+tracer = Tracer()
@@ -0,0 +1,327 @@
+"""
+Usage Ledger - Persistent per-call LLM usage records in SQLite.
+Every LLM call (and semantic cache hit) is tagged with tenant, proposal, schema, section,
+provider and model and appended to a local SQLite database in WAL mode, so usage
+survives restarts and is shared by all workers on the host. Writes are buffered
+and flushed in batches off the event loop; aggregation queries run over a time window.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns usage can be grouped by
+GROUP_COLUMNS = ("tenant_id", "proposal_id", "schema_id", "section", "provider", "model", "cache_hit")
+
+_COLUMNS = (
+    "ts", "tenant_id", "proposal_id", "schema_id", "section", "provider", "model", "cache_hit",
+    "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens", "cost", "latency"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    tenant_id TEXT,
+    proposal_id TEXT,
+    schema_id TEXT,
+    section TEXT,
+    provider TEXT,
+    model TEXT,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    latency REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_ts ON llm_usage (ts);
+"""
+
+# Indexes for budget lookups (created after migrations, which may add their columns)
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_llm_usage_proposal ON llm_usage (proposal_id);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_tenant_ts ON llm_usage (tenant_id, ts);
+"""
+
+# Tags (proposal_id, tenant_id) for LLM calls made by the current task
+_usage_tags: ContextVar[Dict[str, str]] = ContextVar("usage_tags", default={})
+
+
+@contextmanager
+def usage_tags(**tags: str):
+    """Tag ledger records of LLM calls made inside the block (proposal_id, tenant_id)"""
+    token = _usage_tags.set({**_usage_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+
+def current_usage_tags() -> Dict[str, str]:
+    """Tags set by the enclosing usage_tags blocks"""
+    return _usage_tags.get()
+
+
+class UsageLedger:
+    """
+    Buffers usage records in memory and appends them to SQLite in batches.
+    If the database cannot be opened (e.g. read-only filesystem) the ledger disables
+    itself; records beyond USAGE_LEDGER_MAX_BUFFER are dropped and counted.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("USAGE_LEDGER_ENABLED", "true").lower() == "true"
+        self.path = os.getenv("USAGE_LEDGER_PATH", "usage_ledger.db")
+        self.flush_interval = float(os.getenv("USAGE_LEDGER_FLUSH_INTERVAL", "2.0"))
+        self.batch_size = int(os.getenv("USAGE_LEDGER_BATCH_SIZE", "200"))
+        self.max_buffer = int(os.getenv("USAGE_LEDGER_MAX_BUFFER", "10000"))
+        self.retention_days = float(os.getenv("USAGE_LEDGER_RETENTION_DAYS", "90"))
+        self.default_window = float(os.getenv("USAGE_LEDGER_DEFAULT_WINDOW", "86400"))
+
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()  # One connection, used from worker threads
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+        logger.info("Usage Ledger initialized", extra={
+            "enabled": self.enabled,
+            "path": self.path,
+            "flush_interval": self.flush_interval
+        })
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            # Databases created before tenant tagging lack the column
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(llm_usage)")}
+            if "tenant_id" not in columns:
+                connection.execute("ALTER TABLE llm_usage ADD COLUMN tenant_id TEXT")
+            connection.executescript(_INDEXES)
+            self._connection = connection
+        return self._connection
+
+    def _prune(self):
+        if self.retention_days > 0:
+            cutoff = time.time() - self.retention_days * 86400
+            with self._db_lock:
+                connection = self._connect()
+                connection.execute("DELETE FROM llm_usage WHERE ts < ?", (cutoff,))
+                connection.commit()
+
+    async def start(self):
+        """Open the database and start the periodic flusher (called on application startup)"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._prune)
+        except sqlite3.Error as e:
+            logger.error(f"Usage ledger unavailable at {self.path} - disabling: {str(e)}")
+            self.enabled = False
+            self._buffer = []
+            return
+        self._flusher = asyncio.create_task(self._flush_periodically(), name="usage-ledger-flusher")
+
+    async def stop(self):
+        """Flush buffered records and close the database (called on shutdown)"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._connection is not None:
+            with self._db_lock:
+                self._connection.close()
+                self._connection = None
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        schema_id: Optional[str] = None,
+        section: Optional[str] = None,
+        cache_hit: bool = False,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        total_tokens: int = 0,
+        cost: float = 0.0,
+        latency: float = 0.0
+    ):
+        """
+        Buffer one LLM call. proposal_id and tenant_id come from the enclosing usage_tags block.
+
+        Args:
+            provider: Provider that served the call
+            model: Model used
+            schema_id: Schema of the draft (if any)
+            section: Section (or pipeline step such as notes_condensing)
+            cache_hit: Served from the semantic cache (no provider call)
+            prompt_tokens: Prompt tokens billed
+            completion_tokens: Completion tokens billed
+            cached_tokens: Prompt tokens served from the provider's prefix cache
+            total_tokens: Total tokens billed
+            cost: Estimated cost in USD
+            latency: API call latency in seconds
+        """
+        if not self.enabled:
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+
+        tags = _usage_tags.get()
+        self._buffer.append((
+            time.time(), tags.get("tenant_id"), tags.get("proposal_id"), schema_id, section, provider, model, int(cache_hit),
+            prompt_tokens, completion_tokens, cached_tokens, total_tokens, cost, latency
+        ))
+        if len(self._buffer) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                pass  # No event loop - the next flush picks the records up
+
+    def _write(self, rows: List[Tuple[Any, ...]]):
+        with self._db_lock:
+            connection = self._connect()
+            connection.executemany(
+                f"INSERT INTO llm_usage ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                rows
+            )
+            connection.commit()
+
+    async def flush(self):
+        """Write buffered records in one transaction"""
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, rows)
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            logger.error(f"Failed to write {len(rows)} usage records: {str(e)}")
+            # Keep the records for the next flush unless the buffer is already full
+            room = self.max_buffer - len(self._buffer)
+            self.dropped += max(0, len(rows) - room)
+            self._buffer = rows[:room] + self._buffer
+
+    def _aggregate(self, since: float, group_by: Sequence[str], limit: int) -> Dict[str, Any]:
+        sums = (
+            "COUNT(*) AS calls, SUM(cache_hit) AS cache_hits, SUM(prompt_tokens) AS prompt_tokens, "
+            "SUM(completion_tokens) AS completion_tokens, SUM(cached_tokens) AS cached_tokens, "
+            "SUM(total_tokens) AS total_tokens, SUM(cost) AS cost, AVG(latency) AS avg_latency"
+        )
+        with self._db_lock:
+            connection = self._connect()
+            connection.row_factory = sqlite3.Row
+            totals = connection.execute(f"SELECT {sums} FROM llm_usage WHERE ts >= ?", (since,)).fetchone()
+            groups = []
+            if group_by:
+                columns = ", ".join(group_by)
+                groups = connection.execute(
+                    f"SELECT {columns}, {sums} FROM llm_usage WHERE ts >= ? "
+                    f"GROUP BY {columns} ORDER BY cost DESC, total_tokens DESC LIMIT ?",
+                    (since, limit)
+                ).fetchall()
+            connection.row_factory = None
+        return {
+            "totals": {key: totals[key] or 0 for key in totals.keys()},
+            "groups": [dict(row) for row in groups]
+        }
+
+    async def aggregate(
+        self,
+        window: Optional[float] = None,
+        group_by: Sequence[str] = ("schema_id", "section"),
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Usage totals and per-group breakdown over a time window.
+
+        Args:
+            window: Seconds back from now (default USAGE_LEDGER_DEFAULT_WINDOW)
+            group_by: Columns from GROUP_COLUMNS to break usage down by
+            limit: Maximum groups returned (most expensive first)
+
+        Returns:
+            Dict with window, totals and groups
+
+        Raises:
+            ValueError: If group_by names an unknown column
+        """
+        unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group usage by: {', '.join(unknown)}")
+        window = window or self.default_window
+        if not self.enabled:
+            return {"enabled": False}
+
+        await self.flush()
+        result = await asyncio.to_thread(self._aggregate, time.time() - window, list(group_by), limit)
+        return {"enabled": True, "window_seconds": window, "group_by": list(group_by), **result}
+
+    def _spend(self, since: float, filters: Dict[str, str]) -> Tuple[int, float]:
+        conditions = "".join(f" AND {column} = ?" for column in filters)
+        with self._db_lock:
+            row = self._connect().execute(
+                f"SELECT SUM(total_tokens), SUM(cost) FROM llm_usage WHERE ts >= ?{conditions}",
+                (since, *filters.values())
+            ).fetchone()
+        return row[0] or 0, row[1] or 0.0
+
+    async def spend(self, since: float = 0.0, **filters: str) -> Tuple[int, float]:
+        """
+        Total tokens and cost recorded since a timestamp, e.g. spend(proposal_id="p-1").
+
+        Args:
+            since: Unix timestamp lower bound
+            filters: Column values from GROUP_COLUMNS to match
+
+        Returns:
+            (tokens, cost) - (0, 0.0) when the ledger is disabled
+        """
+        unknown = [column for column in filters if column not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot filter usage by: {', '.join(unknown)}")
+        if not self.enabled:
+            return 0, 0.0
+        await self.flush()
+        return await asyncio.to_thread(self._spend, since, filters)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors
+        }
+
+
+# Global usage ledger instance
+usage_ledger = UsageLedger()